@@ -1,39 +1,50 @@
-from pynput import mouse
-from operation_object.message_sender.message_sender import MessageSender
-from operation_object.eyetracking.eyetracking import EyeTracking
+import argparse
+import multiprocessing
+import os
+import sys
+from operation_object.registry import Registry
+from operation_object.job_queue import Job, JobQueue, load_jobs
+from operation_object.display_pool import DisplayPool
+from operation_object.input_backend import BACKEND_ENV_VAR, BACKENDS
+from operation_object.tracing import enable_tracing, get_tracer
+from operation_object.input_hooks import CLICK, Aborted, get_hooks
 
 def get_mouse_position():
     """Wait for user to click to capture position"""
     print("Move your mouse to the target position and click once...")
-    
-    position_captured = False
-    x, y = 0, 0
-
-    def on_click(cx, cy, button, pressed):
-        nonlocal position_captured, x, y
-        if button == mouse.Button.left and pressed:
-            x, y = cx, cy
-            position_captured = True
-            return False  # Stop listener
-    
-    with mouse.Listener(on_click=on_click) as listener:
-        listener.join()
-
-    if position_captured:
-        print(f"Position captured: ({x}, {y})")
-        return x, y
-    return None
-
-def get_procedure_choice():
+
+    position = get_hooks().start().capture_one(CLICK)
+    if position:
+        print(f"Position captured: ({position[0]}, {position[1]})")
+    return position
+
+def start_input_hooks():
+    """Install the shared input hooks so Esc aborts a running workflow"""
+    if os.environ.get(BACKEND_ENV_VAR) == "null":
+        return False  # Nothing is driven on a real screen, so there is nothing to abort
+    try:
+        get_hooks().start()
+        return True
+    except Exception as e:
+        print(f"Abort hotkey unavailable: {str(e)}")
+        return False
+
+def position_set(position):
+    """Captured coordinates, or a template image located at run time, count as set"""
+    return "template" in position or (position.get("x", -1) != -1 and position.get("y", -1) != -1)
+
+def get_procedure_choice(registry):
     """Get user's choice for which automation procedure to run"""
+    procedures = list(registry)
     print("\nChoose automation procedure:")
-    print("1. Message Sender")
-    print("2. Eye Tracking")
+    for number, procedure in enumerate(procedures, 1):
+        print(f"{number}. {procedure.name}")
+    choices = [str(number) for number in range(1, len(procedures) + 1)]
     while True:
-        choice = input("Enter your choice (1 or 2): ").strip()
-        if choice in ['1', '2']:
-            return choice
-        print("Invalid choice. Please enter 1 or 2.")
+        choice = input(f"Enter your choice (1-{len(procedures)}): ").strip()
+        if choice in choices:
+            return procedures[int(choice) - 1]
+        print(f"Invalid choice. Please enter a number from 1 to {len(procedures)}.")
 
 def get_message_sender_action():
     """Get user's choice for message sender actions"""
@@ -52,23 +63,27 @@ def get_eye_tracking_action(all_positions_set):
     if all_positions_set:
         print("1. Start execution")
         print("2. Reset all positions")
+        print("3. Recalibrate from two reference positions")
+        choices = ['1', '2', '3']
     else:
         print("1. Calibrate all positions")
         print("2. Reset all positions")
+        choices = ['1', '2']
     while True:
-        choice = input("Enter your choice (1 or 2): ").strip()
-        if choice in ['1', '2']:
+        choice = input(f"Enter your choice ({', '.join(choices[:-1])} or {choices[-1]}): ").strip()
+        if choice in choices:
             return choice
-        print("Invalid choice. Please enter 1 or 2.")
+        print(f"Invalid choice. Please enter {', '.join(choices[:-1])} or {choices[-1]}.")
 
-def run_message_sender():
-    """Execute the message sender procedure"""
+def run_message_sender(procedure, action=None, resume=False):
+    """Execute the message sender procedure; prompts for the action unless one is given"""
+    interactive = action is None
     try:
         print("Initializing MessageSender...")
-        sender = MessageSender()
+        sender = procedure.load()()
 
         # Get user's choice for message sender
-        choice = get_message_sender_action()
+        choice = get_message_sender_action() if interactive else ACTION_CHOICES[action]
         
         if choice == '2':
             # Reset position
@@ -76,86 +91,330 @@ def run_message_sender():
                 print("Position has been reset. Please set new position.")
             else:
                 print("Failed to reset position")
-                return
+                return False
+            if not interactive:
+                return True
 
         # Check if position is already set
-        if sender.position["x"] == -1 or sender.position["y"] == -1:
+        if not position_set(sender.position):
+            if not interactive:
+                print("No position set. Run interactively once to capture it.")
+                return False
             print("No position set. Please click on the target position...")
             position = get_mouse_position()
             if position:
                 if not sender.capture_position(position[0], position[1]):
                     print("Failed to capture position")
-                    return
+                    return False
             else:
                 print("No valid position captured")
-                return
+                return False
         else:
-            print(f"Using existing position: ({sender.position['x']}, {sender.position['y']})")
+            print(f"Using existing position: ({sender.position.get('x')}, {sender.position.get('y')})")
 
         # Execute the workflow
         print("Starting workflow execution...")
-        if sender.execute():
+        if sender.execute(resume=resume):
             print("Workflow completed successfully!")
-        else:
-            print("Workflow failed.")
+            return True
+        print("Workflow failed.")
+        return False
     except Exception as e:
         print(f"Error in message sender procedure: {str(e)}")
+        return False
 
-def run_eye_tracking():
-    """Execute the eye tracking procedure"""
+def run_eye_tracking(procedure, action=None, resume=False):
+    """Execute the eye tracking procedure; prompts for the action unless one is given"""
+    interactive = action is None
     try:
         print("Initializing EyeTracking...")
-        tracker = EyeTracking()
+        tracker = procedure.load()()
 
         # Check if all positions are set
         all_positions_set = True
         for pos_name, pos_value in tracker.positions.items():
-            if pos_value["x"] == -1 or pos_value["y"] == -1:
+            if not position_set(pos_value):
                 all_positions_set = False
                 break
 
         # Get user's choice for eye tracking
-        choice = get_eye_tracking_action(all_positions_set)
+        choice = get_eye_tracking_action(all_positions_set) if interactive else ACTION_CHOICES[action]
         
         if choice == '2':
             # Reset all positions
             if tracker.reset_positions():
                 print("All positions have been reset.")
                 print("Please run the calibration option to set new positions.")
-            else:
-                print("Failed to reset positions")
-            return
+                return True
+            print("Failed to reset positions")
+            return False
+
+        if choice == '3':
+            # Derive every position from two freshly captured ones
+            if tracker.recalibrate_layout():
+                print("Positions recalibrated. Please run execute option to start the workflow.")
+                return True
+            print("Layout recalibration failed")
+            return False
 
         # If positions aren't set or user chose to calibrate
-        if not all_positions_set or (choice == '1' and not all_positions_set):
+        if not all_positions_set:
+            if not interactive:
+                print("Positions are not calibrated. Run interactively once to calibrate them.")
+                return False
             print("\nStarting position calibration...")
             if not tracker.position_calibration():
                 print("Position calibration failed")
-                return
+                return False
             print("Position calibration completed. Please run execute option to start the workflow.")
-            return
+            return True
         
         # Execute workflow if all positions are set and user chose to execute
-        if all_positions_set and choice == '1':
-            print("\nStarting workflow execution...")
-            if tracker.execute():
-                print("Workflow completed successfully!")
-            else:
-                print("Workflow failed.")
+        print("\nStarting workflow execution...")
+        if tracker.execute(resume=resume):
+            print("Workflow completed successfully!")
+            return True
+        print("Workflow failed.")
+        return False
     except Exception as e:
         print(f"Error in eye tracking procedure: {str(e)}")
+        return False
 
-def main():
+def run_procedure(procedure, action=None, resume=False):
+    """Execute a procedure that has no interactive runner of its own"""
     try:
+        if action not in (None, "execute"):
+            raise ValueError(f"{procedure.name} only supports the execute action")
+
+        print(f"Initializing {procedure.name}...")
+        operation = procedure.load()()
+
+        print("Starting workflow execution...")
+        if operation.execute(resume=resume):
+            print("Workflow completed successfully!")
+            return True
+        print("Workflow failed.")
+        return False
+    except Exception as e:
+        print(f"Error in {procedure.name} procedure: {str(e)}")
+        return False
+
+# Procedures with an interactive runner; any other procedure uses run_procedure
+RUNNERS = {
+    "message_sender": run_message_sender,
+    "eyetracking": run_eye_tracking,
+}
+
+# Batch actions and the menu choice they stand for
+ACTION_CHOICES = {
+    "execute": '1',
+    "reset": '2',
+}
+
+# Exit codes for batch mode
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+def parse_args(argv=None):
+    """Parse command-line options; no options means the interactive menu"""
+    parser = argparse.ArgumentParser(description="Run automation procedures")
+    parser.add_argument("--procedure", help="procedure to run without prompts (e.g. eyetracking)")
+    parser.add_argument("--action", choices=sorted(ACTION_CHOICES), default="execute",
+                        help="action for --procedure (default: execute)")
+    parser.add_argument("--repeat", type=int, default=1, help="number of runs for --procedure")
+    parser.add_argument("--jobs", help="TOML job file with [[job]] tables (procedure, action, repeat)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="input backend for this run")
+    parser.add_argument("--stop-on-failure", action="store_true", help="stop the queue at the first failed run")
+    parser.add_argument("--displays", help="comma-separated X displays to run jobs on in parallel (e.g. :1,:2,:3)")
+    parser.add_argument("--profiles", help="directory of per-display position profiles (<display number>.toml)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the first stage the last failed run did not complete")
+    parser.add_argument("--trace", help="record spans and write <TRACE>.jsonl and <TRACE>.trace.json")
+    parser.add_argument("--send", help="send every record of a .csv/.jsonl file (or - for stdin) with the message sender")
+    parser.add_argument("--rate", type=float, help="records per second for --send (default: bulk_rate in metadata.toml)")
+    parser.add_argument("--burst", type=int, help="records that may be sent back to back for --send")
+    parser.add_argument("--record", help="record a manual session (clicks and keys, Esc stops) to this trace file")
+    parser.add_argument("--replay", help="replay a trace recorded with --record")
+    parser.add_argument("--max-gap", type=float, default=0.5, help="longest pause between replayed events in seconds")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed factor applied before --max-gap")
+    parser.add_argument("--ready-after", type=float,
+                        help="wait for the screen to settle instead of sleeping for recorded gaps longer than this")
+    parser.add_argument("--to-steps", help="print a recorded trace as [positions] and [stage] TOML tables")
+    parser.add_argument("--stage-name", default="recorded", help="stage name used by --to-steps")
+    parser.add_argument("--daemon", action="store_true",
+                        help="stay loaded and serve run/status/cancel requests on localhost HTTP")
+    parser.add_argument("--submit", help="run this procedure on a running --daemon and stream its progress")
+    parser.add_argument("--port", type=int, help="port for --daemon and --submit (default: 8765)")
+    return parser.parse_args(argv)
+
+def run_batch(args, registry):
+    """Run the requested jobs from a queue without prompts and return an exit code"""
+    try:
+        jobs = load_jobs(args.jobs) if args.jobs else []
+        if args.procedure:
+            if args.repeat < 1:
+                raise ValueError("--repeat must be at least 1")
+            jobs.append(Job(args.procedure, args.action, args.repeat))
+        if args.displays and args.resume:
+            raise ValueError("--resume cannot be used with --displays: runs in the pool are not checkpointed")
+
+        # Validate every job before the first run starts
+        for job in jobs:
+            registry.get(job.procedure)
+            if job.action not in ACTION_CHOICES:
+                raise ValueError(f"Unknown action '{job.action}' for {job.procedure}")
+            if args.displays and job.action != "execute":
+                raise ValueError(f"Only the execute action can run with --displays, got '{job.action}' "
+                                 f"for {job.procedure}")
+    except KeyError as e:
+        print(f"Invalid batch request: {e.args[0]}")
+        return EXIT_USAGE
+    except (ValueError, OSError) as e:
+        print(f"Invalid batch request: {str(e)}")
+        return EXIT_USAGE
+
+    def execute(job):
+        procedure = registry.get(job.procedure)
+        return RUNNERS.get(procedure.key, run_procedure)(procedure, job.action, args.resume)
+
+    if args.displays:
+        displays = [display.strip() for display in args.displays.split(",") if display.strip()]
+        summary = DisplayPool(displays, args.profiles, args.backend, args.trace).run(
+            jobs, stop_on_failure=args.stop_on_failure)
+    else:
+        start_input_hooks()
+        summary = JobQueue(jobs).run(execute, stop_on_failure=args.stop_on_failure)
+    print("\n" + summary.report())
+    return EXIT_OK if summary.failed == 0 else EXIT_FAILED
+
+def run_bulk_send(args, registry):
+    """Stream the records of --send through the message sender and return an exit code"""
+    try:
+        if args.procedure not in (None, "message_sender"):
+            raise ValueError("--send only works with the message_sender procedure")
+        if args.rate is not None and args.rate < 0:
+            raise ValueError("--rate must not be negative")
+        if args.burst is not None and args.burst < 1:
+            raise ValueError("--burst must be at least 1")
+        if args.send != "-" and not os.path.exists(args.send):
+            raise ValueError(f"No such file: {args.send}")
+    except ValueError as e:
+        print(f"Invalid bulk send request: {str(e)}")
+        return EXIT_USAGE
+
+    # Imported here so the other modes do not load the bulk sender
+    from operation_object.message_sender.bulk_sender import BulkSender
+
+    sender = registry.get("message_sender").load()()
+    if not position_set(sender.position):
+        print("No position set. Run interactively once to capture it.")
+        return EXIT_FAILED
+    sender.adapt_layout()
+    start_input_hooks()
+    try:
+        success = BulkSender(sender, args.send, args.rate, args.burst).run(resume=args.resume)
+    except ValueError as e:
+        print(f"Error during bulk send: {str(e)}")
+        return EXIT_FAILED
+    except Aborted:
+        print("Bulk send cancelled; run again with --resume to continue")
+        return EXIT_INTERRUPTED
+    return EXIT_OK if success else EXIT_FAILED
+
+def run_recorder(args):
+    """Record, replay or convert a manual session trace and return an exit code"""
+    # Imported here so the other modes do not load numpy
+    from operation_object import recorder
+
+    try:
+        if args.record:
+            print("Recording clicks and keys; press Esc to stop...")
+            count = recorder.Recorder(args.record).record()
+            print(f"Recorded {count} events to {args.record}")
+            return EXIT_OK
+        if args.to_steps:
+            import toml
+
+            print(toml.dumps(recorder.trace_to_stage(args.to_steps, args.stage_name)))
+            return EXIT_OK
+
+        from operation_object.input_backend import create_backend
+
+        ready = recorder.settled_screen() if args.ready_after is not None else None
+        player = recorder.Player(create_backend(), args.max_gap, args.speed, args.ready_after, ready)
+        start_input_hooks()
+        count, recorded, replayed = player.play(args.replay)
+        print(f"Replayed {count} events in {replayed:.1f}s (recorded in {recorded:.1f}s)")
+        return EXIT_OK
+    except Aborted:
+        print("Replay cancelled")
+        return EXIT_INTERRUPTED
+    except (OSError, ValueError) as e:
+        print(f"Error with trace: {str(e)}")
+        return EXIT_FAILED
+
+def run_submit(args):
+    """Hand --submit to a running daemon and return an exit code from its outcome"""
+    from operation_object.daemon import DEFAULT_PORT, submit
+
+    def show(event):
+        if event["event"] == "stage":
+            print(f"[{event['index']}/{event['total']}] {event['stage']}")
+        elif event["event"] in ("retry", "failed"):
+            print(f"{event['event']}: {event['error']}")
+
+    try:
+        final = submit(args.submit, args.port or DEFAULT_PORT, args.resume, show)
+    except OSError as e:
+        print(f"No daemon on port {args.port or DEFAULT_PORT}: {str(e)}")
+        return EXIT_FAILED
+    if final is None or final["event"] != "finished":
+        print(f"Run rejected: {(final or {}).get('error', 'no response')}")
+        return EXIT_FAILED
+    print(f"{final['procedure']} {final['outcome']} in {final['seconds']:.1f}s")
+    if final["outcome"] == "cancelled":
+        return EXIT_INTERRUPTED
+    return EXIT_OK if final["outcome"] == "succeeded" else EXIT_FAILED
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.backend:
+        # Operation objects pick the backend up from the environment
+        os.environ[BACKEND_ENV_VAR] = args.backend
+    if args.trace:
+        enable_tracing()
+
+    if args.submit:
+        return run_submit(args)
+
+    try:
+        # Procedures are discovered from their metadata.toml and imported on selection
+        registry = Registry()
+        if not len(registry):
+            print("No procedures found: no operation_object/*/metadata.toml declares a [procedure] table")
+            return EXIT_FAILED
+        if args.daemon:
+            from operation_object.daemon import DEFAULT_PORT, serve
+
+            start_input_hooks()
+            serve(registry, args.port or DEFAULT_PORT)
+            return EXIT_OK
+        if args.send:
+            return run_bulk_send(args, registry)
+        if args.record or args.replay or args.to_steps:
+            return run_recorder(args)
+        if args.procedure or args.jobs:
+            return run_batch(args, registry)
+
+        start_input_hooks()
         while True:
             # Get user's choice for procedure
-            procedure = get_procedure_choice()
+            procedure = get_procedure_choice(registry)
             
             # Execute chosen procedure
-            if procedure == '1':
-                run_message_sender()
-            else:
-                run_eye_tracking()
+            RUNNERS.get(procedure.key, run_procedure)(procedure, resume=args.resume)
             
             # Ask if user wants to continue
             if input("\nDo you want to run another procedure? (y/n): ").lower() != 'y':
@@ -163,8 +422,17 @@ def main():
             
     except KeyboardInterrupt:
         print("\nProgram terminated by user")
+        return EXIT_INTERRUPTED
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+        return EXIT_FAILED
+    finally:
+        if args.trace:
+            for path in get_tracer().write(args.trace):
+                print(f"Trace written to {path}")
+    return EXIT_OK
 
 if __name__ == "__main__":
-    main()
+    # Required for --displays worker processes in the frozen PyInstaller binary
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,12 +1,20 @@
 # -*- mode: python ; coding: utf-8 -*-
+import json
+import os
 
 block_cipher = None
 
+# Slim build profile generated by utility/build_profile.py (optional)
+build_profile = {}
+if os.path.exists('build_profile.json'):
+    with open('build_profile.json') as f:
+        build_profile = json.load(f)
+
 added_files = [
     ('operation_object/message_sender/metadata.toml', 'operation_object/message_sender'),
     ('operation_object/eyetracking/metadata.toml', 'operation_object/eyetracking'),
-    ('requirements.txt', '.'),
-    ('requirements_windows.txt', '.')
+    ('requirements/requirements.txt', '.'),
+    ('requirements/requirements_windows.txt', '.')
 ]
 
 a = Analysis(
@@ -14,11 +22,15 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=added_files,
-    hiddenimports=[],
+    # Procedures are imported lazily by operation_object.registry
+    hiddenimports=build_profile.get('hiddenimports', [
+        'operation_object.message_sender.message_sender',
+        'operation_object.eyetracking.eyetracking',
+    ]),
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=build_profile.get('excludes', []),
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
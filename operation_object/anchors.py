@@ -0,0 +1,169 @@
+import os
+import time
+from operation_object.waiters import grab_region
+
+
+def to_gray_array(image, downscale: int = 1):
+    """Convert a PIL image to a float grayscale NumPy array, optionally downscaled"""
+    import numpy as np
+
+    gray = image.convert("L")
+    if downscale > 1:
+        gray = gray.reduce(downscale)
+    return np.asarray(gray, dtype=np.float64)
+
+
+def match_template(image, template):
+    """Normalized cross-correlation of template over image; returns (score, (row, col)) of the best hit
+
+    The correlation is computed with FFTs and the per-window normalization with
+    integral images, so the cost grows with the image size rather than with
+    image size times template size.
+    """
+    import numpy as np
+
+    ih, iw = image.shape
+    th, tw = template.shape
+    if th > ih or tw > iw:
+        return -1.0, (0, 0)
+
+    centered = template - template.mean()
+    template_norm = np.sqrt((centered ** 2).sum())
+    if template_norm == 0:
+        return -1.0, (0, 0)  # A flat template matches everything equally badly
+
+    shape = (ih + th - 1, iw + tw - 1)
+    spectrum = np.fft.rfft2(image, shape) * np.fft.rfft2(centered[::-1, ::-1], shape)
+    correlation = np.fft.irfft2(spectrum, shape)[th - 1:ih, tw - 1:iw]
+
+    def window_sums(values):
+        integral = np.zeros((ih + 1, iw + 1))
+        integral[1:, 1:] = values.cumsum(0).cumsum(1)
+        return integral[th:, tw:] - integral[:-th, tw:] - integral[th:, :-tw] + integral[:-th, :-tw]
+
+    sums = window_sums(image)
+    variance = window_sums(image ** 2) - sums ** 2 / (th * tw)
+    denominator = np.sqrt(np.maximum(variance, 0)) * template_norm
+    scores = np.where(denominator > 1e-6, correlation / np.maximum(denominator, 1e-6), 0.0)
+
+    index = int(scores.argmax())
+    row, col = divmod(index, scores.shape[1])
+    return float(scores[row, col]), (row, col)
+
+
+class Anchor:
+    """A position located on screen by a small template image"""
+
+    def __init__(self, name, template_path, x, y, margin: int, threshold: float, downscale: int,
+                 template_scale: float = None):
+        from PIL import Image
+
+        self.name = name
+        self.template_image = Image.open(template_path)
+        # Screenshot pixels per point where the template was cut (2 on Retina);
+        # None means the same density as the screen being searched
+        self.template_scale = template_scale
+        self.threshold = threshold
+        self.downscale = downscale
+        self.margin = margin
+        # The stored coordinates seed the region of interest until the first hit
+        self.last_hit = (x, y) if x != -1 and y != -1 else None
+        self._templates = {}
+
+    def template_for(self, pixel_ratio: float):
+        """Grayscale template array, cached per screen pixel ratio"""
+        key = round(pixel_ratio, 2)
+        if key not in self._templates:
+            image = self.template_image
+            scale = key / self.template_scale if self.template_scale else 1.0
+            if round(scale, 2) != 1.0:
+                image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+            self._templates[key] = to_gray_array(image, self.downscale)
+        return self._templates[key]
+
+    def search_region(self):
+        """Region of interest around the last hit, or None for the full screen"""
+        if self.last_hit is None:
+            return None
+        # In points; without a template_scale the pixel size is an upper bound
+        scale = self.template_scale or 1.0
+        width, height = self.template_image.width / scale, self.template_image.height / scale
+        x, y = self.last_hit
+        left = max(0, int(x - width / 2 - self.margin))
+        top = max(0, int(y - height / 2 - self.margin))
+        # Keep the region on the same downscale grid as a full-screen search so both see the same pixels
+        left -= left % self.downscale
+        top -= top % self.downscale
+        return left, top, int(width + 2 * self.margin), int(height + 2 * self.margin)
+
+
+class AnchorLocator:
+    """Resolves template-anchored positions, searching a cached region first and the full screen on a miss"""
+
+    def __init__(self, positions, base_dir, grab=grab_region, screen_size=None):
+        self.grab = grab
+        self.screen_size = screen_size
+        self.anchors = {}
+        for name, position in positions.items():
+            if "template" not in position:
+                continue
+            self.anchors[name] = Anchor(
+                name,
+                os.path.join(base_dir, position["template"]),
+                position.get("x", -1),
+                position.get("y", -1),
+                margin=position.get("search_margin", 80),
+                threshold=position.get("threshold", 0.85),
+                downscale=position.get("downscale", 2),
+                template_scale=position.get("template_scale"),
+            )
+        self.stats = {"roi_hits": 0, "full_searches": 0, "last_ms": 0.0}
+
+    def __contains__(self, name):
+        return name in self.anchors
+
+    def _screen_width(self):
+        if self.screen_size is None:
+            import pyautogui
+
+            self.screen_size = tuple(pyautogui.size())
+        return self.screen_size[0]
+
+    def _search(self, anchor, region):
+        screenshot = self.grab(region)
+        if region is None:
+            left = top = 0
+            requested_width = self._screen_width()
+        else:
+            left, top, requested_width, _ = region
+        # Screenshots on HiDPI screens have more pixels than the requested region has points
+        pixel_ratio = screenshot.width / requested_width
+
+        template = anchor.template_for(pixel_ratio)
+        score, (row, col) = match_template(to_gray_array(screenshot, anchor.downscale), template)
+        if score < anchor.threshold:
+            return None
+
+        th, tw = template.shape
+        x = left + (col + tw / 2) * anchor.downscale / pixel_ratio
+        y = top + (row + th / 2) * anchor.downscale / pixel_ratio
+        return x, y
+
+    def locate(self, name):
+        """Screen coordinates of the anchor's centre; raise LookupError if it is not visible"""
+        anchor = self.anchors[name]
+        start = time.perf_counter()
+        found = None
+        region = anchor.search_region()
+        if region is not None:
+            found = self._search(anchor, region)
+            if found is not None:
+                self.stats["roi_hits"] += 1
+        if found is None:
+            self.stats["full_searches"] += 1
+            found = self._search(anchor, None)
+        self.stats["last_ms"] = (time.perf_counter() - start) * 1000
+        if found is None:
+            raise LookupError(f"Anchor '{name}' not found on screen")
+        anchor.last_hit = found
+        return found
@@ -0,0 +1,126 @@
+import asyncio
+import concurrent.futures
+import time
+from operation_object.input_hooks import Aborted, get_hooks
+
+
+class LoopClock:
+    """Clock whose sleeps are timers on the runner's event loop, so they can be paused and cancelled"""
+
+    def __init__(self, runner):
+        self.runner = runner
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        future = asyncio.run_coroutine_threadsafe(self.runner.sleep(seconds), self.runner.loop)
+        try:
+            future.result()
+        except (asyncio.CancelledError, concurrent.futures.CancelledError):
+            raise Aborted("Aborted by hotkey")
+
+
+class AsyncRunner:
+    """Runs a WorkflowEngine plan with every sleep and screen-wait poll scheduled on an asyncio loop
+
+    The engine's step sequence (retries, checkpoints, delay profiles) runs
+    unchanged on one worker thread; each of its sleeps is a cancellable task on
+    the loop. A watcher task checks the input hooks every tick: the abort
+    hotkey cancels the pending sleep, so a run stops within one tick instead of
+    finishing a 30 s wait, and the pause hotkey freezes the timers until it is
+    pressed again. Further coroutines passed as monitors run alongside.
+    """
+
+    def __init__(self, engine, hooks=None, tick: float = 0.05, monitors=()):
+        self.engine = engine
+        self.hooks = hooks or get_hooks()
+        self.tick = tick
+        self.monitors = list(monitors)
+        self.loop = None
+        self._sleeps = set()
+
+    async def sleep(self, seconds: float):
+        """Sleep in ticks, not counting time spent paused"""
+        if self.hooks.aborted.is_set():
+            raise asyncio.CancelledError()
+        task = asyncio.current_task()
+        self._sleeps.add(task)
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + max(0.0, seconds)
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                if self.hooks.paused.is_set():
+                    paused_at = loop.time()
+                    while self.hooks.paused.is_set():
+                        await asyncio.sleep(self.tick)
+                    deadline += loop.time() - paused_at
+                    continue
+                await asyncio.sleep(min(self.tick, remaining))
+        finally:
+            self._sleeps.discard(task)
+
+    def abort(self):
+        """Cancel every pending sleep; the worker then raises Aborted"""
+        self.hooks.aborted.set()
+        for task in list(self._sleeps):
+            task.cancel()
+
+    async def _watch(self, worker):
+        paused = False
+        while not worker.done():
+            if self.hooks.aborted.is_set() and self._sleeps:
+                print("\nAbort requested; stopping the workflow")
+                self.abort()
+            if self.hooks.paused.is_set() != paused:
+                paused = self.hooks.paused.is_set()
+                print("\nWorkflow paused; press the pause key again to continue" if paused else "\nWorkflow resumed")
+            await asyncio.sleep(self.tick)
+
+    async def run_async(self, plan=None, resume: bool = False):
+        self.loop = asyncio.get_running_loop()
+        worker = self.loop.run_in_executor(None, self.engine.run, plan, resume)
+        tasks = [asyncio.create_task(self._watch(worker))]
+        tasks.extend(asyncio.create_task(monitor) for monitor in self.monitors)
+        try:
+            return await worker
+        finally:
+            if not worker.done():
+                self.abort()  # Interrupted from outside, e.g. Ctrl-C; let the worker stop too
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run(self, plan=None, resume: bool = False):
+        """Run the plan on a fresh event loop and return the engine's result"""
+        clock = LoopClock(self)
+        saved = self.engine.clock, {name: wait.clock for name, wait in self.engine.waits.items()}
+        self.engine.clock = clock
+        for wait in self.engine.waits.values():
+            wait.clock = clock
+        try:
+            return asyncio.run(self.run_async(plan, resume))
+        finally:
+            self.engine.clock = saved[0]
+            for name, wait_clock in saved[1].items():
+                self.engine.waits[name].clock = wait_clock
+
+
+def run_plan(engine, plan=None, resume: bool = False):
+    """Run a plan with the AsyncRunner if [configuration] async_runner is set, otherwise directly
+
+    The abort hotkey ends only this run: it returns False with
+    engine.last_result.cancelled set. Ctrl-C still propagates.
+    """
+    try:
+        if engine.config["configuration"].get("async_runner", False):
+            return AsyncRunner(engine).run(plan, resume)
+        return engine.run(plan, resume=resume)
+    except Aborted as e:
+        print(f"\nWorkflow cancelled: {str(e)}")
+        return False
+    finally:
+        get_hooks().aborted.clear()
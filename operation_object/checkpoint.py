@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from operation_object.config_store import atomic_write
+
+
+def config_hash(config):
+    """Stable hash of a parsed config; any change to positions or steps invalidates checkpoints"""
+    encoded = json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class Checkpoint:
+    """Records completed stages of a workflow run so a failed run can resume"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def completed_stages(self, config):
+        """Stages completed by the last run, or [] if there is none or the config has changed"""
+        state = self.load()
+        if state is None:
+            return []
+        if state.get("config_hash") != config_hash(config):
+            print("Checkpoint was written for a different configuration; starting from the beginning")
+            return []
+        return [entry["stage"] for entry in state.get("stages", [])]
+
+    def start(self, config, completed=()):
+        """Begin a run, keeping the entries for stages that are being skipped"""
+        state = self.load() if completed else None
+        stages = [entry for entry in (state or {}).get("stages", []) if entry["stage"] in completed]
+        self._write({"config_hash": config_hash(config), "stages": stages})
+
+    def mark(self, stage):
+        """Persist that a stage completed"""
+        state = self.load() or {"stages": []}
+        state["stages"].append({
+            "stage": stage,
+            "completed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        self._write(state)
+
+    def clear(self):
+        """Remove the checkpoint once the whole workflow has completed"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _write(self, state):
+        atomic_write(self.path, json.dumps(state, indent=2))
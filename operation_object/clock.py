@@ -0,0 +1,34 @@
+import time
+
+
+class SystemClock:
+    """Real monotonic time and real sleeps"""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """Simulated time: sleeps return immediately and only advance the clock"""
+
+    def __init__(self, start: float = 0.0):
+        self.time = start
+        self.slept = 0.0
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds: float):
+        seconds = max(0.0, seconds)
+        self.time += seconds
+        self.slept += seconds
+
+    def advance(self, seconds: float):
+        """Account for simulated work that is not a sleep (e.g. input injection latency)"""
+        self.time += max(0.0, seconds)
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,76 @@
+import copy
+import os
+import tempfile
+from contextlib import contextmanager
+import toml
+
+# Parsed configs shared by every store in the process: path -> ((mtime_ns, size), config)
+_cache = {}
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def atomic_write(path, text: str):
+    """Write text to path via a temp file in the same directory and an atomic rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ConfigStore:
+    """Cached, batched and atomic access to a procedure's metadata.toml"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._batch_depth = 0
+        self._pending = None
+
+    def load(self):
+        """Return a private copy of the parsed config, re-reading the file only if its mtime changed"""
+        signature = _signature(self.path)
+        cached = _cache.get(self.path)
+        if cached is None or cached[0] != signature:
+            with open(self.path) as f:
+                cached = (signature, toml.load(f))
+            _cache[self.path] = cached
+        return copy.deepcopy(cached[1])
+
+    def save(self, config):
+        """Write config atomically, or defer the write until the enclosing batch commits"""
+        if self._batch_depth:
+            self._pending = config
+            return
+        self._write(config)
+
+    def _write(self, config):
+        atomic_write(self.path, toml.dumps(config))
+        _cache[self.path] = (_signature(self.path), copy.deepcopy(config))
+
+    @contextmanager
+    def batch(self):
+        """Group several saves into a single write, committed only if the block succeeds"""
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self._batch_depth == 1:
+                self._pending = None  # Roll back: the file keeps its previous contents
+            raise
+        finally:
+            self._batch_depth -= 1
+
+        if self._batch_depth == 0 and self._pending is not None:
+            pending, self._pending = self._pending, None
+            self._write(pending)
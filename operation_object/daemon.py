@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operation_object.input_hooks import get_hooks
+
+DEFAULT_PORT = 8765
+
+
+class Daemon:
+    """Keeps procedures, their configs and input backends loaded between runs
+
+    Operation objects are created on the first run of a procedure and reused
+    until their metadata.toml changes on disk. One run executes at a time;
+    status() and cancel() may be called from any thread while it does.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._operations = {}  # key -> (operation, metadata.toml signature)
+        self._lock = threading.Lock()
+        self.state = "idle"
+        self.procedure = None
+        self.stage = None
+        self.started = None
+        self.runs = 0
+        self.last = None
+
+    @staticmethod
+    def _signature(operation):
+        stat = os.stat(operation.store.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def operation(self, key):
+        """The warm operation object of a procedure, rebuilt if its config was edited"""
+        cached = self._operations.get(key)
+        if cached is not None and self._signature(cached[0]) == cached[1]:
+            return cached[0]
+        operation = self.registry.get(key).load()()
+        self._operations[key] = (operation, self._signature(operation))
+        return operation
+
+    def preload(self):
+        """Load every procedure up front so the first run is warm too"""
+        for procedure in self.registry:
+            try:
+                self.operation(procedure.key)
+            except Exception as e:
+                print(f"Could not preload {procedure.name}: {str(e)}")
+
+    def status(self):
+        return {
+            "state": self.state,
+            "procedure": self.procedure,
+            "stage": self.stage,
+            "running_for": time.monotonic() - self.started if self.state == "running" else None,
+            "runs": self.runs,
+            "last": self.last,
+            "loaded": sorted(self._operations),
+        }
+
+    def cancel(self):
+        """Abort the current run at its next sleep tick or action; False if nothing is running"""
+        if self.state != "running":
+            return False
+        get_hooks().aborted.set()
+        return True
+
+    def run(self, key, resume: bool = False, on_progress=None):
+        """Execute a procedure with the warm objects and return the run summary
+
+        Raises RuntimeError if another run is in progress and KeyError for an
+        unknown procedure.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError(f"{self.procedure} is already running")
+        try:
+            self.registry.get(key)  # Unknown procedures fail before the state changes
+            self.state, self.procedure, self.stage, self.started = "running", key, None, time.monotonic()
+            operation = self.operation(key)
+
+            def progress(event):
+                if event["event"] == "stage":
+                    self.stage = event["stage"]
+                if on_progress is not None:
+                    on_progress(event)
+
+            operation.engine.on_progress = progress
+            operation.engine.last_result = None  # A stale cancelled result must not label this run
+            outcome = "failed"
+            try:
+                if operation.execute(resume=resume):
+                    outcome = "succeeded"
+                elif operation.engine.last_result is not None and operation.engine.last_result.cancelled:
+                    outcome = "cancelled"
+            except KeyboardInterrupt:
+                outcome = "cancelled"
+            finally:
+                operation.engine.on_progress = None
+                get_hooks().aborted.clear()
+                # Saves made by the run itself keep the object warm
+                self._operations[key] = (operation, self._signature(operation))
+
+            self.runs += 1
+            self.last = {"procedure": key, "outcome": outcome, "stage": self.stage,
+                         "seconds": round(time.monotonic() - self.started, 3)}
+            return self.last
+        finally:
+            self.state, self.procedure, self.stage = "idle", None, None
+            self._lock.release()
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """GET /status, POST /cancel and POST /run with a JSON body {"procedure": ..., "resume": false}
+
+    /run streams newline-delimited JSON: one line per progress event, then a
+    final {"event": "finished", ...} line with the outcome.
+
+    Web pages open on the same machine can reach 127.0.0.1 too, so requests
+    carrying an Origin header are refused and POSTs must be application/json,
+    which browsers cannot send cross-origin without a preflight that is never
+    answered.
+    """
+
+    def _reply(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _refuse_browser(self, post: bool):
+        """Reply 403/415 and return True for requests that may come from a web page"""
+        if self.headers.get("Origin") is not None:
+            self._reply(403, {"error": "cross-origin requests are not accepted"})
+            return True
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if post and content_type != "application/json":
+            self._reply(415, {"error": "POST bodies must be sent as application/json"})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._refuse_browser(post=False):
+            return
+        if self.path == "/status":
+            self._reply(200, self.server.daemon.status())
+        else:
+            self._reply(404, {"error": f"unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        if self._refuse_browser(post=True):
+            return
+        daemon = self.server.daemon
+        if self.path == "/cancel":
+            self._reply(200, {"cancelled": daemon.cancel()})
+            return
+        if self.path != "/run":
+            self._reply(404, {"error": f"unknown endpoint {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            key = request["procedure"]
+        except (ValueError, KeyError):
+            self._reply(400, {"error": 'expected a JSON body with "procedure"'})
+            return
+        if daemon.state == "running":
+            self._reply(409, {"error": f"{daemon.procedure} is already running"})
+            return
+        try:
+            daemon.registry.get(key)
+        except KeyError:
+            self._reply(404, {"error": f"unknown procedure {key}"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        def send(event):
+            try:
+                self.wfile.write((json.dumps(event) + "\n").encode())
+                self.wfile.flush()
+            except OSError:
+                pass  # The client went away; the run carries on and shows up in /status
+
+        try:
+            summary = daemon.run(key, bool(request.get("resume", False)), send)
+        except RuntimeError as e:
+            send({"event": "rejected", "error": str(e)})
+            return
+        send(dict(event="finished", **summary))
+
+    def log_message(self, format, *args):
+        pass  # Runs already report their progress on the console
+
+
+def serve(registry, port: int = DEFAULT_PORT, host: str = "127.0.0.1"):
+    """Serve run/status/cancel requests until interrupted; only binds to localhost by default"""
+    daemon = Daemon(registry)
+    daemon.preload()
+    server = ThreadingHTTPServer((host, port), DaemonHandler)
+    server.daemon_threads = True
+    server.daemon = daemon
+    print(f"Daemon listening on http://{host}:{server.server_port} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def submit(procedure, port: int = DEFAULT_PORT, resume: bool = False, on_event=print, host: str = "127.0.0.1"):
+    """Run a procedure on a daemon, passing each streamed event to on_event; return the final event"""
+    from http.client import HTTPConnection
+
+    connection = HTTPConnection(host, port)
+    try:
+        connection.request("POST", "/run", json.dumps({"procedure": procedure, "resume": resume}),
+                           {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        if response.status != 200:
+            return dict(event="rejected", **json.loads(response.read() or b"{}"))
+        event = None
+        for line in response:
+            event = json.loads(line)
+            on_event(event)
+        return event
+    finally:
+        connection.close()
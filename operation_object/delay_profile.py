@@ -0,0 +1,117 @@
+import json
+import math
+import os
+from operation_object.config_store import atomic_write
+
+
+def percentile(samples, pct: float):
+    """Nearest-rank percentile of a non-empty list of samples"""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class DelayProfile:
+    """Per-step delays learned from run history and persisted as JSON
+
+    Steps with a configured screen wait record how long that wait took; the
+    engine measures the other steps by how long the screen took to react and
+    settle, until they have min_samples. Once enough samples exist a step's
+    delay is a safety margin over a high percentile of them. Steps without
+    enough samples are never tightened below the default delay: nothing shows
+    it would be safe. Any failure backs the delays of the failing stage off and
+    drops their samples, so they are measured again.
+    """
+
+    def __init__(self, path, default_delay: float, percentile: float = 95.0, margin: float = 1.25,
+                 min_delay: float = 0.1, max_delay: float = None, tighten: float = 0.8,
+                 backoff: float = 2.0, min_samples: int = 5, window: int = 50):
+        self.path = path
+        self.default_delay = default_delay
+        self.percentile = percentile
+        self.margin = margin
+        self.min_delay = min_delay
+        self.max_delay = max_delay if max_delay is not None else default_delay * 5
+        self.tighten = tighten
+        self.backoff = backoff
+        self.min_samples = min_samples
+        self.window = window
+        self.steps = {}
+
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.steps = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable delay profile {path}: {str(e)}")
+
+    @classmethod
+    def from_config(cls, path, configuration):
+        """Build a profile from a [configuration] section, honouring adaptive_delay_* keys"""
+        options = {
+            key[len("adaptive_delay_"):]: value
+            for key, value in configuration.items()
+            if key.startswith("adaptive_delay_")
+        }
+        return cls(path, configuration["default_delay"], **options)
+
+    def _entry(self, step: str):
+        return self.steps.setdefault(step, {"delay": self.default_delay, "samples": []})
+
+    def _clamp(self, delay: float):
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def delay_for(self, step: str):
+        """Current delay to apply after the named step"""
+        entry = self.steps.get(step)
+        if entry is None:
+            return self.default_delay
+        if len(entry["samples"]) < self.min_samples:
+            # Also covers profiles saved by older versions that tightened unmeasured steps
+            return max(entry["delay"], self.default_delay)
+        return entry["delay"]
+
+    def measured(self, step: str):
+        """True once the step has enough samples for a learned delay"""
+        entry = self.steps.get(step)
+        return entry is not None and len(entry["samples"]) >= self.min_samples
+
+    def record_ready(self, step: str, seconds: float):
+        """Record a measured time-to-ready for the step"""
+        entry = self._entry(step)
+        entry["samples"] = (entry["samples"] + [round(seconds, 4)])[-self.window:]
+        if len(entry["samples"]) >= self.min_samples:
+            entry["delay"] = self._clamp(percentile(entry["samples"], self.percentile) * self.margin)
+
+    def record_success(self, steps):
+        """After a successful run, derive measured steps' delays from their samples
+
+        Steps with too few samples only decay from a backed-off delay towards
+        the default, never below it.
+        """
+        for step in dict.fromkeys(steps):
+            entry = self.steps.get(step)
+            if entry is None:
+                continue
+            if len(entry["samples"]) >= self.min_samples:
+                entry["delay"] = self._clamp(percentile(entry["samples"], self.percentile) * self.margin)
+            elif entry["delay"] > self.default_delay:
+                entry["delay"] = max(self.default_delay, entry["delay"] * self.tighten)
+
+    def record_failure(self, steps):
+        """Back off the given steps after a failure and drop their stale samples"""
+        for step in dict.fromkeys(steps):
+            entry = self._entry(step)
+            entry["delay"] = self._clamp(max(entry["delay"] * self.backoff, self.default_delay))
+            entry["samples"] = []
+
+    def save(self):
+        """Persist the profile next to the procedure's metadata; a profile without a path stays in memory"""
+        if self.path is None:
+            return True
+        try:
+            atomic_write(self.path, json.dumps(self.steps, indent=2, sort_keys=True))
+            return True
+        except OSError as e:
+            print(f"Error saving delay profile: {str(e)}")
+            return False
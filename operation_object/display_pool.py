@@ -0,0 +1,195 @@
+import multiprocessing
+import os
+import queue
+import time
+from operation_object.input_backend import BACKEND_ENV_VAR
+from operation_object.job_queue import JobResult, JobSummary
+from operation_object.layout import adapt_to_screen
+from operation_object.tracing import enable_tracing, get_tracer
+
+
+def load_profile(path):
+    """Read per-display position overrides: [<procedure>.positions.<name>] tables"""
+    if path is None or not os.path.exists(path):
+        return {}
+    import toml
+    return toml.load(path)
+
+
+def apply_profile(operation, procedure_key, profile):
+    """Override an operation object's positions in memory; nothing is written back
+
+    Profile positions are in the coordinates of the profile's own
+    [<procedure>.layout] screen, or of the worker's display if it has none.
+    The other positions are rescaled to that screen first, so the layout check
+    in execute() moves all of them together or none at all.
+    """
+    section = profile.get(procedure_key, {})
+    overrides = section.get("positions", {})
+    if not overrides:
+        return
+    screen = section.get("layout", {}).get("screen")
+    if screen is not None:
+        adapt_to_screen(operation.config, screen)
+    elif not operation.adapt_layout():
+        raise RuntimeError("Cannot apply the position profile without the display's screen size")
+    positions = operation.config["positions"]
+    for name, value in overrides.items():
+        if name not in positions:
+            raise ValueError(f"Profile sets unknown position '{name}' for {procedure_key}")
+        # Update in place so objects holding references to the position dicts see the change
+        positions[name].update(x=value["x"], y=value["y"])
+
+
+def _worker(display, profile_path, backend, trace, jobs, results):
+    """Worker process bound to one X display; runs jobs until it receives None"""
+    # Must be set before pyautogui / pynput are imported, which happens on first job
+    os.environ["DISPLAY"] = display
+    if backend:
+        os.environ[BACKEND_ENV_VAR] = backend
+    if trace:
+        enable_tracing()
+
+    from operation_object.registry import Registry
+
+    registry = Registry()
+    profile = load_profile(profile_path)
+    while True:
+        item = jobs.get()
+        if item is None:
+            break
+        job, run = item
+        start = time.monotonic()
+        try:
+            if job.action != "execute":
+                raise ValueError(f"Only the execute action can run in parallel, got '{job.action}'")
+            procedure = registry.get(job.procedure)
+            operation = procedure.load()()
+            apply_profile(operation, procedure.key, profile)
+            # Workers share the procedure directory, so runs in the pool are not checkpointed
+            operation.engine.checkpoint = None
+            success = bool(operation.execute())
+        except Exception as e:
+            print(f"[{display}] Error running {job.procedure}: {str(e)}")
+            success = False
+        results.put((display, job, run, success, time.monotonic() - start))
+
+    if trace:
+        # One trace per worker, e.g. run-1.trace.json for display :1
+        get_tracer().write(f"{trace}-{display.lstrip(':').replace(':', '_')}")
+
+
+class PoolSummary(JobSummary):
+    """Job summary with a per-display breakdown"""
+
+    def __init__(self):
+        super().__init__()
+        self.by_display = {}
+        self.missing = 0  # Runs lost because their worker died
+        self.skipped = 0  # Runs dropped by stop_on_failure
+
+    @property
+    def failed(self):
+        return super().failed + self.missing
+
+    def add(self, display, result):
+        self.results.append(result)
+        counts = self.by_display.setdefault(display, [0, 0])
+        counts[0 if result.success else 1] += 1
+
+    def report(self):
+        lines = [super().report()]
+        for display, (succeeded, failed) in sorted(self.by_display.items()):
+            lines.append(f"  {display}: {succeeded} succeeded, {failed} failed")
+        if self.missing:
+            lines.append(f"  {self.missing} runs lost to crashed workers")
+        if self.skipped:
+            lines.append(f"  {self.skipped} runs skipped after a failure")
+        return "\n".join(lines)
+
+
+class DisplayPool:
+    """Run workflows in parallel, one worker process per X display (e.g. Xvfb :1 to :N)
+
+    Each worker can load a position profile from <profile_dir>/<display number>.toml,
+    so instances laid out differently on each display can share one job queue.
+    """
+
+    def __init__(self, displays, profile_dir=None, backend=None, trace=None):
+        if not displays:
+            raise ValueError("At least one display is required")
+        self.displays = list(displays)
+        self.profile_dir = profile_dir
+        self.backend = backend
+        self.trace = trace
+
+    def profile_path(self, display):
+        if self.profile_dir is None:
+            return None
+        return os.path.join(self.profile_dir, f"{display.lstrip(':').replace(':', '_')}.toml")
+
+    def run(self, jobs, stop_on_failure: bool = False):
+        """Distribute every run of every job across the workers and aggregate the results
+
+        With stop_on_failure, runs not yet started are dropped after the first
+        failure; runs already in progress on other displays still finish.
+        """
+        # Spawn gives each worker a fresh interpreter, so DISPLAY is read at import time
+        context = multiprocessing.get_context("spawn")
+        job_queue = context.Queue()
+        result_queue = context.Queue()
+
+        total = 0
+        for job in jobs:
+            for run in range(1, job.repeat + 1):
+                job_queue.put((job, run))
+                total += 1
+        for _ in self.displays:
+            job_queue.put(None)
+
+        summary = PoolSummary()
+        workers = [
+            context.Process(target=_worker, name=f"worker-{display}",
+                            args=(display, self.profile_path(display), self.backend, self.trace,
+                                  job_queue, result_queue))
+            for display in self.displays
+        ]
+        for worker in workers:
+            worker.start()
+        stopping = False
+        try:
+            while len(summary.results) < total:
+                if not any(worker.is_alive() for worker in workers) and result_queue.empty():
+                    print("All workers exited before the queue was drained")
+                    break
+                try:
+                    display, job, run, success, seconds = result_queue.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                summary.add(display, JobResult(job, run, success, seconds))
+                if not success and stop_on_failure and not stopping:
+                    stopping = True
+                    summary.skipped = self._drop_pending(job_queue)
+                    total -= summary.skipped
+        finally:
+            for worker in workers:
+                worker.join(timeout=5.0)
+                if worker.is_alive():
+                    worker.terminate()
+        summary.missing = total - len(summary.results)
+        summary.finished = time.monotonic()
+        return summary
+
+    def _drop_pending(self, job_queue):
+        """Remove the runs no worker has taken yet, keep one stop marker per worker; return the number dropped"""
+        dropped = 0
+        while True:
+            try:
+                item = job_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                dropped += 1
+        for _ in self.displays:
+            job_queue.put(None)
+        return dropped
@@ -0,0 +1,293 @@
+import csv
+import fnmatch
+import json
+import os
+import re
+import time
+from operation_object.clock import SYSTEM_CLOCK
+from operation_object.config_store import atomic_write
+
+# Cell values that stand for a missing measurement in exports
+MISSING = ("", "-", "NA", "N/A", "nan", "NaN")
+
+
+def find_export(directory, pattern: str = "*.tsv", max_age: float = None, exclude=()):
+    """Newest file in directory matching pattern, optionally no older than max_age seconds
+
+    exclude holds (path, mtime) pairs of exports already handled; a file
+    rewritten under the same name has a new mtime and is found again.
+    """
+    newest = None
+    for entry in os.scandir(directory):
+        path = os.path.abspath(entry.path)
+        if not entry.is_file() or not fnmatch.fnmatch(entry.name, pattern):
+            continue
+        mtime = entry.stat().st_mtime
+        if (path, mtime) in exclude:
+            continue
+        if max_age is not None and time.time() - mtime > max_age:
+            continue
+        if newest is None or mtime > newest[0]:
+            newest = (mtime, path)
+    return newest[1] if newest else None
+
+
+def wait_for_export(directory, pattern="*.tsv", max_age=None, exclude=(), settle: float = 1.0,
+                    timeout: float = 120.0, interval: float = 0.5, clock=SYSTEM_CLOCK):
+    """Wait for a new export and return its path once its size and mtime stop changing for settle seconds"""
+    deadline = clock.now() + timeout
+    last = None
+    stable_since = None
+    while True:
+        path = find_export(directory, pattern, max_age, exclude)
+        if path is not None:
+            stat = os.stat(path)
+            signature = (path, stat.st_size, stat.st_mtime_ns)
+            if signature != last:
+                last, stable_since = signature, clock.now()
+            elif stat.st_size > 0 and clock.now() - stable_since >= settle:
+                return path
+        if clock.now() >= deadline:
+            raise TimeoutError(f"No complete export matching '{pattern}' appeared in {directory} within {timeout}s")
+        clock.sleep(interval)
+
+
+def read_chunks(path, chunk_rows: int = 50000):
+    """Yield (header, rows) chunks of a delimited export without loading the whole file"""
+    delimiter = "," if path.lower().endswith(".csv") else "\t"
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        chunk = []
+        for row in reader:
+            if not row:
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield header, chunk
+                chunk = []
+        if chunk:
+            yield header, chunk
+
+
+def to_float(values):
+    """Convert a sequence of cells to float64, with missing or malformed cells as NaN"""
+    import numpy as np
+
+    cells = np.array(values, dtype=str)
+    cells[np.isin(cells, MISSING)] = "nan"
+    try:
+        return cells.astype(np.float64)
+    except ValueError:
+        # Decimal commas or stray text: fall back to converting cell by cell
+        converted = np.empty(len(cells))
+        for index, cell in enumerate(cells):
+            try:
+                converted[index] = float(cell.replace(",", "."))
+            except ValueError:
+                converted[index] = np.nan
+        return converted
+
+
+class ColumnStore:
+    """Append-only columnar store: one raw float64 file per column and session, read back as memmaps
+
+    <root>/<session>/meta.json lists the columns, the row count, the AOI labels
+    (AOIs are stored as int32 codes) and the source files already ingested.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def session_dir(self, session):
+        return os.path.join(self.root, re.sub(r"[^\w.-]", "_", session))
+
+    def meta(self, session):
+        try:
+            with open(os.path.join(self.session_dir(session), "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_meta(self, session, meta):
+        atomic_write(os.path.join(self.session_dir(session), "meta.json"), json.dumps(meta, indent=2))
+
+    def append(self, session, meta, codes, columns):
+        """Append one chunk: int32 AOI codes plus float64 columns in meta["columns"] order"""
+        directory = self.session_dir(session)
+        os.makedirs(directory, exist_ok=True)
+        files = [("aoi.i32", codes)] + [(f"col{index}.f64", values) for index, values in enumerate(columns)]
+        for name, values in files:
+            with open(os.path.join(directory, name), "ab") as f:
+                # Drop bytes past the recorded rows, left behind by an interrupted append
+                f.truncate(meta["rows"] * values.itemsize)
+                values.tofile(f)
+        # Rows only become visible once every column file holds them
+        meta["rows"] += len(codes)
+        self.write_meta(session, meta)
+
+    def load(self, session):
+        """(AOI labels, int32 codes, {column: float64 memmap}) of a session"""
+        import numpy as np
+
+        meta = self.meta(session)
+        if meta is None:
+            raise KeyError(session)
+        directory = self.session_dir(session)
+        rows = meta["rows"]
+
+        def column(name, dtype):
+            if rows == 0:
+                return np.empty(0, dtype=dtype)
+            return np.memmap(os.path.join(directory, name), dtype=dtype, mode="r", shape=(rows,))
+
+        columns = {name: column(f"col{index}.f64", np.float64) for index, name in enumerate(meta["columns"])}
+        return meta["aoi_labels"], column("aoi.i32", np.int32), columns
+
+
+class AoiIngest:
+    """Streams AOI exports into a ColumnStore and computes per-AOI metrics"""
+
+    def __init__(self, store_dir, aoi_column: str = "AOI", chunk_rows: int = 50000):
+        self.store = ColumnStore(store_dir)
+        self.aoi_column = aoi_column
+        self.chunk_rows = chunk_rows
+        # Exports without data rows, which start no session but must not be picked again
+        self.empty_path = os.path.join(store_dir, "empty_sources.json")
+
+    def empty_sources(self):
+        try:
+            with open(self.empty_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _record_empty(self, path, mtime):
+        os.makedirs(self.store.root, exist_ok=True)
+        sources = self.empty_sources() + [{"path": path, "mtime": mtime}]
+        atomic_write(self.empty_path, json.dumps(sources, indent=2))
+
+    def ingested_sources(self):
+        """(path, mtime) of every export already in the store, including those without data rows"""
+        sources = {(source["path"], source["mtime"]) for source in self.empty_sources()}
+        if os.path.isdir(self.store.root):
+            for entry in os.scandir(self.store.root):
+                meta = self.store.meta(entry.name) if entry.is_dir() else None
+                sources.update((source["path"], source["mtime"]) for source in (meta or {}).get("sources", []))
+        return sources
+
+    def session_for(self, path):
+        """Default session of an export: its file name, plus its time if that name was ingested from an older file"""
+        path = os.path.abspath(path)
+        session = os.path.splitext(os.path.basename(path))[0]
+        mtime = os.path.getmtime(path)
+        meta = self.store.meta(session)
+        if meta is not None and any(source["path"] == path and source["mtime"] != mtime
+                                    for source in meta["sources"]):
+            # A re-export overwrote the file; keep it apart from the old recording's rows
+            session += time.strftime("_%Y%m%d-%H%M%S", time.localtime(mtime))
+        return session
+
+    def ingest(self, path, session=None):
+        """Append an export to its session (default: session_for(path)) and return the number of rows added"""
+        import numpy as np
+
+        path = os.path.abspath(path)
+        session = session or self.session_for(path)
+        meta = self.store.meta(session)
+        mtime = os.path.getmtime(path)
+        if meta is not None and any(source["path"] == path and source["mtime"] == mtime
+                                    for source in meta["sources"]):
+            print(f"{path} is already in session {session}")
+            return 0
+
+        if meta is not None and meta.get("pending"):
+            # A previous ingest was interrupted; forget its partial rows
+            meta["rows"] = meta.pop("pending")["rows_before"]
+
+        added = 0
+        for header, rows in read_chunks(path, self.chunk_rows):
+            if self.aoi_column not in header:
+                raise ValueError(f"{path} has no '{self.aoi_column}' column")
+            aoi_index = header.index(self.aoi_column)
+            cells = list(zip(*[row + [""] * (len(header) - len(row)) for row in rows]))
+
+            if meta is None:
+                # The first chunk fixes the schema: every column that is mostly numeric
+                numeric = [name for index, name in enumerate(header)
+                           if index != aoi_index and np.isfinite(to_float(cells[index])).mean() >= 0.5]
+                meta = {"columns": numeric, "rows": 0, "aoi_labels": [], "sources": []}
+            meta.setdefault("pending", {"path": path, "rows_before": meta["rows"]})
+            missing = [name for name in meta["columns"] if name not in header]
+            if missing:
+                raise ValueError(f"{path} lacks columns of session {session}: {', '.join(missing)}")
+
+            labels = {label: code for code, label in enumerate(meta["aoi_labels"])}
+            for label in cells[aoi_index]:
+                if label not in labels:
+                    labels[label] = len(meta["aoi_labels"])
+                    meta["aoi_labels"].append(label)
+            codes = np.fromiter((labels[label] for label in cells[aoi_index]), dtype=np.int32, count=len(rows))
+            columns = [to_float(cells[header.index(name)]) for name in meta["columns"]]
+            self.store.append(session, meta, codes, columns)
+            added += len(rows)
+
+        if meta is not None:
+            meta.pop("pending", None)
+            meta["sources"].append({"path": path, "mtime": mtime, "rows": added})
+            self.store.write_meta(session, meta)
+        else:
+            self._record_empty(path, mtime)
+        return added
+
+    def summarize(self, session, block_rows: int = None):
+        """Per-AOI count, mean, min and max of every column, accumulated block by block over the memmaps"""
+        import numpy as np
+
+        labels, codes, columns = self.store.load(session)
+        size = len(labels)
+        block_rows = block_rows or self.chunk_rows
+        counts = np.zeros(size, dtype=np.int64)
+        stats = {name: {"n": np.zeros(size), "sum": np.zeros(size),
+                        "min": np.full(size, np.inf), "max": np.full(size, -np.inf)} for name in columns}
+
+        for start in range(0, len(codes), block_rows):
+            block_codes = np.asarray(codes[start:start + block_rows])
+            counts += np.bincount(block_codes, minlength=size)
+            for name, values in columns.items():
+                block = np.asarray(values[start:start + block_rows])
+                valid = np.isfinite(block)
+                valid_codes, valid_values = block_codes[valid], block[valid]
+                column = stats[name]
+                column["n"] += np.bincount(valid_codes, minlength=size)
+                column["sum"] += np.bincount(valid_codes, weights=valid_values, minlength=size)
+                np.minimum.at(column["min"], valid_codes, valid_values)
+                np.maximum.at(column["max"], valid_codes, valid_values)
+
+        summary = {}
+        for code, label in enumerate(labels):
+            metrics = {"rows": int(counts[code])}
+            for name, column in stats.items():
+                n = column["n"][code]
+                metrics[name] = {
+                    "mean": float(column["sum"][code] / n) if n else None,
+                    "min": float(column["min"][code]) if n else None,
+                    "max": float(column["max"][code]) if n else None,
+                }
+            summary[label] = metrics
+        return summary
+
+    def write_summary(self, session, summary):
+        """Write summary.csv next to the session's columns and return its path"""
+        path = os.path.join(self.store.session_dir(session), "summary.csv")
+        names = self.store.meta(session)["columns"]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["AOI", "rows"] + [f"{name} {stat}" for name in names for stat in ("mean", "min", "max")])
+            for label, metrics in summary.items():
+                writer.writerow([label, metrics["rows"]] + [
+                    "" if metrics[name][stat] is None else metrics[name][stat]
+                    for name in names for stat in ("mean", "min", "max")])
+        return path
@@ -1,22 +1,33 @@
-from pyautogui import click, doubleClick
 from datetime import datetime
-import time
-import toml
 import os
-from pynput import mouse, keyboard
-from pynput.keyboard import Key, KeyCode
+from operation_object.input_backend import create_backend, DEFAULT_BACKEND
+from operation_object.config_store import ConfigStore
+from operation_object.workflow import WorkflowEngine
+from operation_object.async_runner import run_plan
+from operation_object.input_hooks import get_hooks
+from operation_object.eyetracking.aoi_ingest import AoiIngest, wait_for_export
+from operation_object.layout import Layout, adapt_to_screen, current_screen, fit_two_points, reference_pair
 
 class EyeTracking:
-    def __init__(self):
+    def __init__(self, backend=None):
         """Initialize the EyeTracking with configuration"""
         try:
             # Get the directory where this script is located
             current_dir = os.path.dirname(os.path.abspath(__file__))
             config_path = os.path.join(current_dir, "metadata.toml")
             
-            self.config = toml.load(config_path)
+            self.store = ConfigStore(config_path)
+            self.config = self.store.load()
             self.delay = self.config["configuration"]["default_delay"]
             self.positions = self.config["positions"]
+
+            # Input backend: explicit argument, then $INPUT_BACKEND, then metadata.toml
+            self.backend = create_backend(
+                backend, self.config["configuration"].get("input_backend", DEFAULT_BACKEND))
+
+            # Stages and steps come from the [workflow] and [stage.*] sections
+            self.engine = WorkflowEngine(self.config, current_dir, self.backend,
+                                         tasks={"ingest_aoi_export": self.ingest_export})
         except Exception as e:
             print(f"Error loading configuration: {str(e)}")
             raise
@@ -24,30 +35,12 @@ class EyeTracking:
     def get_mouse_position(self):
         """Wait for backtick key press to capture current mouse position"""
         print("Move your mouse to the target position and press ` (backtick) key to capture...")
-        
-        position_captured = False
-        x, y = 0, 0
-        mouse_controller = mouse.Controller()
 
-        def on_press(key):
-            nonlocal position_captured, x, y
-            try:
-                if key.char == '`':
-                    # Get current mouse position
-                    x, y = mouse_controller.position
-                    position_captured = True
-                    return False  # Stop listener
-            except AttributeError:
-                pass  # Ignore special keys
-
-        # Listen for backtick key press
-        with keyboard.Listener(on_press=on_press) as listener:
-            listener.join()
-        
-        if position_captured:
-            print(f"Position captured: ({x}, {y})")
-            return x, y
-        return None
+        # The shared hooks stay installed, so repeated captures start no new threads
+        position = get_hooks().start().capture_one()
+        if position:
+            print(f"Position captured: ({position[0]}, {position[1]})")
+        return position
 
     def reset_positions(self):
         """Reset all stored positions to default values and log the old positions"""
@@ -62,7 +55,7 @@ class EyeTracking:
             # Prepare the log entry for all positions
             log_entry = f"[{timestamp}] Positions reset:\n"
             for pos_name, pos_value in self.positions.items():
-                log_entry += f"  {pos_name}: x={pos_value['x']}, y={pos_value['y']}\n"
+                log_entry += f"  {pos_name}: x={pos_value.get('x', -1)}, y={pos_value.get('y', -1)}\n"
             
             # Append to legacy file
             with open(legacy_file, "a") as f:
@@ -76,10 +69,8 @@ class EyeTracking:
             # Update the positions in config
             self.config["positions"] = self.positions
             
-            # Save updated positions to config file
-            config_path = os.path.join(current_dir, "metadata.toml")
-            with open(config_path, "w") as f:
-                toml.dump(self.config, f)
+            # Save updated config atomically (deferred while a batch is open)
+            self.store.save(self.config)
             
             print("All positions have been reset and previous positions logged")
             return True
@@ -99,11 +90,8 @@ class EyeTracking:
             # Update the position in config
             self.config["positions"] = self.positions
             
-            # Save updated position to config file
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            config_path = os.path.join(current_dir, "metadata.toml")
-            with open(config_path, "w") as f:
-                toml.dump(self.config, f)
+            # Save updated config atomically (deferred while a batch is open)
+            self.store.save(self.config)
             
             print(f"Position '{position_name}' captured: ({x}, {y})")
             return True
@@ -116,26 +104,20 @@ class EyeTracking:
         try:
             print("\nStarting position calibration...")
             print("You will need to set positions for all interface elements.")
+            print("Move the mouse to each element and press ` (backtick) to capture it, "
+                  "Backspace to redo the previous one, Esc to stop.")
+            hooks = get_hooks().start()
             
-            # Iterate through all positions in the config
-            for position_name in self.positions.keys():
-                while True:
-                    # Format position name for display (convert from snake_case to Title Case)
-                    display_name = position_name.replace('_', ' ').title()
-                    print(f"\nPlease set position for: {display_name}")
-                    
-                    # Get position from user
-                    position = self.get_mouse_position()
-                    if position:
-                        x, y = position
-                        if self.capture_position(position_name, x, y):
-                            break  # Successfully captured position
-                    
-                    # If position capture failed or was interrupted
-                    retry = input("Failed to capture position. Retry? (y/n): ").lower()
-                    if retry != 'y':
-                        print(f"Skipping {display_name}...")
-                        break
+            # Collect every capture in one pass and write metadata.toml once at the end
+            with self.store.batch():
+                captured = hooks.capture_sequence(self.positions.keys(), self.capture_position)
+
+                # Remember the screen the positions belong to, so they can be rescaled later
+                self.config.setdefault("layout", {})["screen"] = list(current_screen())
+                self.store.save(self.config)
+
+            if captured < len(self.positions):
+                return False
             
             print("\nPosition calibration completed!")
             return True
@@ -143,235 +125,88 @@ class EyeTracking:
         except Exception as e:
             print(f"Error during position calibration: {str(e)}")
             return False
-        
-    def open_eyetracker(self):
-        """Stage 1: Open the eyetracker"""
-        try:
-            # Get the position
-            pos = self.positions["open_eyetracker_position"]
-            
-            # Validate position
-            if pos["x"] == -1 or pos["y"] == -1:
-                raise ValueError("Eyetracker position not set. Please calibrate positions first.")
 
-            # Double click at the position
-            print("Opening eyetracker application...")
-            doubleClick(x=pos["x"], y=pos["y"])
-            time.sleep(self.delay)  # Wait for application to open
-            time.sleep(7)
-
-            print("Eyetracker application opened")
-            return True
-        except Exception as e:  
-            print(f"Error during eyetracker opening stage: {str(e)}")
-            return False
-
-    def open_project(self):
-        """Stage 2: Open and set up the project"""
+    def ingest_export(self):
+        """Wait for the AOI export, append it to the columnar store and write its per-AOI summary"""
+        export = self.config.get("export", {})
+        if not export.get("directory"):
+            print("No export directory configured; skipping AOI ingestion")
+            return
+
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        ingest = AoiIngest(os.path.join(current_dir, export.get("store", "aoi_store")),
+                           export.get("aoi_column", "AOI"), export.get("chunk_rows", 50000))
+        print("Waiting for the AOI export to be written...")
+        path = wait_for_export(
+            os.path.expanduser(export["directory"]),
+            export.get("pattern", "*.tsv"),
+            max_age=export.get("max_age", 600),
+            exclude=ingest.ingested_sources(),
+            settle=export.get("settle", 1.0),
+            timeout=export.get("timeout", 120.0),
+            clock=self.engine.clock,
+        )
+        session = ingest.session_for(path)
+        rows = ingest.ingest(path, session)
+        if rows == 0:
+            print(f"{os.path.basename(path)} has no data rows; nothing to summarize")
+            return
+        summary_path = ingest.write_summary(session, ingest.summarize(session))
+        print(f"Ingested {rows} rows from {os.path.basename(path)}; summary written to {summary_path}")
+
+    def adapt_layout(self):
+        """Rescale all positions in memory if the screen geometry changed since they were captured
+
+        Nothing is saved: display pool profiles and other screens sharing this
+        metadata.toml keep their own coordinates. Calibration stores the screen.
+        """
+        if self.backend.name == "null":
+            return True  # Nothing is clicked on a real screen
         try:
-            # Get all required positions
-            project_pos = self.positions["open_project_position"]
-            record_pos = self.positions["test_record_position"]
-            save_pos = self.positions["save_button_position"]
-            
-            # Validate all positions
-            for name, pos in [("Project button", project_pos), 
-                            ("Test record", record_pos),
-                            ("Save button", save_pos)]:
-                if pos["x"] == -1 or pos["y"] == -1:
-                    raise ValueError(f"{name} position not set. Please calibrate positions first.")
-
-            # Click project button
-            print("Opening project dialog...")
-            click(x=project_pos["x"], y=project_pos["y"])
-            time.sleep(self.delay)
-
-            # Click test record
-            print("Selecting test record...")
-            click(x=record_pos["x"], y=record_pos["y"])
-            time.sleep(self.delay)
-
-            # Click save button
-            print("Saving selection...")
-            click(x=save_pos["x"], y=save_pos["y"])
-            time.sleep(self.delay)
-
-            print("Project setup completed")
-            return True
-        except Exception as e:
-            print(f"Error during project opening stage: {str(e)}")
-            return False
-
-    def calibration(self):
-        """Stage 3: Perform calibration"""
-        try:
-            # Get all required positions
-            test_select_pos = self.positions["test_select_position"]
-            calibrate_pos = self.positions["calibrate_position"]
-            confirm_pos = self.positions["calibrate_confirm_position"]
-            
-            # Validate all positions
-            for name, pos in [("Test select", test_select_pos), 
-                            ("Calibrate", calibrate_pos),
-                            ("Calibrate confirm", confirm_pos)]:
-                if pos["x"] == -1 or pos["y"] == -1:
-                    raise ValueError(f"{name} position not set. Please calibrate positions first.")
-
-            # Click test select button
-            print("Selecting test...")
-            click(x=test_select_pos["x"], y=test_select_pos["y"])
-            time.sleep(self.delay)
-
-            # Click calibrate button
-            print("Starting calibration...")
-            click(x=calibrate_pos["x"], y=calibrate_pos["y"])
-            time.sleep(self.delay)
-
-            print("Calibration initiated")
-
-            # Wait for calibration to complete
-            print("Waiting for calibration process (30 seconds)...")
-            time.sleep(30)
-
-            # Click confirm button
-            print("Confirming calibration...")
-            click(x=confirm_pos["x"], y=confirm_pos["y"])
-            time.sleep(self.delay)
-
-            print("Calibration completed and confirmed")
+            adapt_to_screen(self.config)
             return True
         except Exception as e:
-            print(f"Error during calibration stage: {str(e)}")
+            print(f"Error checking screen layout: {str(e)}")
             return False
 
-    def eyetracking_record(self):
-        """Stage 4: Record eye tracking data"""
+    def recalibrate_layout(self):
+        """Capture two reference positions again and derive all others from them"""
         try:
-            # Get all required positions
-            start_pos = self.positions["start_record_position"]
-            confirm_pos = self.positions["record_confirm_position"]
-            
-            # Validate all positions
-            for name, pos in [("Start record", start_pos), 
-                            ("Record confirm", confirm_pos)]:
-                if pos["x"] == -1 or pos["y"] == -1:
-                    raise ValueError(f"{name} position not set. Please calibrate positions first.")
-
-            # Click start record button
-            print("Starting recording...")
-            click(x=start_pos["x"], y=start_pos["y"])
-            time.sleep(self.delay)
-
-            # Wait for recording duration
-            print("Recording in progress (20 seconds)...")
-            time.sleep(20)
+            layout = Layout.from_config(self.config)
+            names = reference_pair(layout)
+            reference = [layout.point(name) for name in names]
+
+            measured = []
+            for name in names:
+                print(f"\nPlease set position for: {name.replace('_', ' ').title()}")
+                position = self.get_mouse_position()
+                if not position:
+                    print("No valid position captured")
+                    return False
+                measured.append(position)
 
-            # Click confirm button
-            print("Confirming recording...")
-            click(x=confirm_pos["x"], y=confirm_pos["y"])
-            time.sleep(self.delay)
+            layout.transform(fit_two_points(reference, measured))
+            layout.screen = current_screen()
+            layout.apply_to(self.config)
+            self.store.save(self.config)
 
-            print("Recording completed and confirmed")
+            print(f"\nRecalibrated {int(layout.set_mask.sum())} positions from {names[0]} and {names[1]}")
             return True
         except Exception as e:
-            print(f"Error during recording stage: {str(e)}")
+            print(f"Error during layout recalibration: {str(e)}")
             return False
 
-    def data_analysis(self):
-        """Stage 5: Analyze recorded data"""
+    def execute(self, resume: bool = False):
+        """Execute the complete eyetracking workflow sequence, optionally resuming after the last completed stage"""
         try:
-            # Get all required positions
-            positions = {
-                "Data Analysis": self.positions["data_analysis_position"],
-                "Interest Area": self.positions["interest_area_position"],
-                "Stimulus Material": self.positions["stimulus_material0_position"],
-                "Square Area Create": self.positions["square_area_create_position"],
-                "Area Delete": self.positions["area0_delete_position"],
-                "Index Area": self.positions["index_area_position"],
-                "AOI Based Output Section": self.positions["aoi_based_output_section_position"],
-                "AOI Based Output Export": self.positions["aoi_based_output_export_position"],
-                "Export Confirm": self.positions["aoi_based_output_export_confirm_position"],
-                "Data Visualization": self.positions["data_visualization_position"]
-            }
-            
-            # Validate all positions
-            for name, pos in positions.items():
-                if pos["x"] == -1 or pos["y"] == -1:
-                    raise ValueError(f"{name} position not set. Please calibrate positions first.")
-
-            # Initial move to data analysis position
-            print("Moving to data analysis section...")
-            click(x=positions["Data Analysis"]["x"], y=positions["Data Analysis"]["y"])
-            time.sleep(self.delay)
+            # Follow screen geometry changes, then validate every stage before the first click
+            self.adapt_layout()
+            plan = self.engine.compile()
 
-            # Interest area creation and deletion sequence
-            print("Configuring interest areas...")
-            click(x=positions["Interest Area"]["x"], y=positions["Interest Area"]["y"])
-            time.sleep(self.delay)
-            
-            click(x=positions["Stimulus Material"]["x"], y=positions["Stimulus Material"]["y"])
-            time.sleep(self.delay)
-            
-            click(x=positions["Square Area Create"]["x"], y=positions["Square Area Create"]["y"])
-            time.sleep(self.delay)
-            
-            print("Waiting for area creation (2 seconds)...")
-            time.sleep(self.delay)
-            
-            click(x=positions["Area Delete"]["x"], y=positions["Area Delete"]["y"])
-            time.sleep(self.delay)
-
-            # Return to data analysis and proceed with AOI based output
-            print("Configuring AOI based output...")
-            click(x=positions["Data Analysis"]["x"], y=positions["Data Analysis"]["y"])
-            time.sleep(self.delay)
-            
-            click(x=positions["Index Area"]["x"], y=positions["Index Area"]["y"])
-            time.sleep(self.delay)
-            
-            click(x=positions["AOI Based Output Section"]["x"], y=positions["AOI Based Output Section"]["y"])
-            time.sleep(self.delay)
-            
-            click(x=positions["AOI Based Output Export"]["x"], y=positions["AOI Based Output Export"]["y"])
-            time.sleep(self.delay)
-            
-            click(x=positions["Export Confirm"]["x"], y=positions["Export Confirm"]["y"])
-            time.sleep(self.delay)
-
-            # Final visualization sequence
-            print("Opening data visualization...")
-            click(x=positions["Data Analysis"]["x"], y=positions["Data Analysis"]["y"])
-            time.sleep(self.delay)
-            
-            click(x=positions["Data Visualization"]["x"], y=positions["Data Visualization"]["y"])
-            time.sleep(self.delay)
-
-            print("Data analysis workflow completed")
-            return True
-        except Exception as e:
-            print(f"Error during data analysis stage: {str(e)}")
-            return False
-
-    def execute(self):
-        """Execute the complete eyetracking workflow sequence"""
-        try:
-            # Execute each stage in sequence
-            stages = [
-                self.open_eyetracker,
-                self.open_project,
-                self.calibration,
-                self.eyetracking_record,
-                self.data_analysis
-            ]
-            
             print("\nStarting eyetracking workflow execution...")
-            for stage in stages:
-                print(f"\nExecuting {stage.__name__} stage...")
-                if not stage():
-                    print(f"Workflow failed at {stage.__name__}")
-                    return False
-                time.sleep(self.delay)
-            
+            if not run_plan(self.engine, plan, resume=resume):
+                return False
+
             print("\nEyetracking workflow completed successfully")
             return True
         except Exception as e:
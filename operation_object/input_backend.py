@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+
+# Environment variable used to pick a backend for a single run without
+# touching metadata.toml (e.g. INPUT_BACKEND=null under CI or Xvfb)
+BACKEND_ENV_VAR = "INPUT_BACKEND"
+DEFAULT_BACKEND = "pyautogui"
+
+# Modifier of the platform's paste shortcut
+PASTE_MODIFIER = "command" if sys.platform == "darwin" else "ctrl"
+
+# pynput's names for special keys that pyautogui spells differently; hotkey() takes pyautogui names
+_CMD = "command" if sys.platform == "darwin" else "win"
+PYNPUT_KEY_NAMES = {
+    "alt_l": "altleft", "alt_r": "altright", "alt_gr": "altright",
+    "caps_lock": "capslock", "cmd": _CMD, "cmd_l": _CMD if _CMD == "command" else "winleft",
+    "cmd_r": _CMD if _CMD == "command" else "winright", "ctrl_l": "ctrlleft", "ctrl_r": "ctrlright",
+    "shift_l": "shiftleft", "shift_r": "shiftright", "page_down": "pagedown", "page_up": "pageup",
+    "print_screen": "printscreen", "num_lock": "numlock", "scroll_lock": "scrolllock", "menu": "apps",
+    "media_play_pause": "playpause", "media_volume_mute": "volumemute", "media_volume_down": "volumedown",
+    "media_volume_up": "volumeup", "media_previous": "prevtrack", "media_next": "nexttrack",
+}
+_PYNPUT_NAMES = {}
+for _name, _value in PYNPUT_KEY_NAMES.items():
+    _PYNPUT_NAMES.setdefault(_value, _name)
+
+# Special key names both libraries share
+COMMON_KEY_NAMES = {"alt", "backspace", "ctrl", "delete", "down", "end", "enter", "esc", "home", "insert",
+                    "left", "pause", "right", "shift", "space", "tab", "up"} | {f"f{n}" for n in range(1, 21)}
+
+
+def backend_key_name(name):
+    """pyautogui-style name of a key reported by pynput, or None if hotkey() cannot press it"""
+    if len(name) == 1:
+        return name if name.isprintable() else None
+    if name in COMMON_KEY_NAMES:
+        return name
+    return PYNPUT_KEY_NAMES.get(name)
+
+
+class InputBackend:
+    """Interface for injecting mouse and keyboard input"""
+    name = "base"
+
+    def click(self, x, y):
+        """Single left click at (x, y)"""
+        raise NotImplementedError
+
+    def double_click(self, x, y):
+        """Double left click at (x, y)"""
+        raise NotImplementedError
+
+    def write(self, text: str, interval: float = 0.0):
+        """Type text as key events, waiting interval seconds between keys"""
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        """Press keys together, e.g. hotkey("ctrl", "v")"""
+        raise NotImplementedError
+
+    def paste(self, text: str, settle: float = 0.05):
+        """Insert text through the clipboard, restoring the previous clipboard contents afterwards"""
+        import pyperclip
+
+        previous = pyperclip.paste()
+        pyperclip.copy(text)
+        self.hotkey(PASTE_MODIFIER, "v")
+        # The target application reads the clipboard asynchronously
+        time.sleep(settle)
+        pyperclip.copy(previous)
+
+
+class PyAutoGUIBackend(InputBackend):
+    """Backend using pyautogui, including its PAUSE and fail-safe checks"""
+    name = "pyautogui"
+
+    def __init__(self, pause=None, failsafe=None):
+        import pyautogui
+
+        self._pyautogui = pyautogui
+        # Only override pyautogui's globals when explicitly asked to
+        if pause is not None:
+            pyautogui.PAUSE = pause
+        if failsafe is not None:
+            pyautogui.FAILSAFE = failsafe
+
+    def click(self, x, y):
+        self._pyautogui.click(x=x, y=y)
+
+    def double_click(self, x, y):
+        self._pyautogui.doubleClick(x=x, y=y)
+
+    def write(self, text: str, interval: float = 0.0):
+        self._pyautogui.write(text, interval=interval)
+
+    def hotkey(self, *keys):
+        self._pyautogui.hotkey(*keys)
+
+
+class PynputBackend(InputBackend):
+    """Low-overhead backend driving pynput controllers directly (Xlib on Linux)"""
+    name = "pynput"
+
+    def __init__(self):
+        from pynput import mouse, keyboard
+
+        self._button = mouse.Button.left
+        self._mouse = mouse.Controller()
+        self._keyboard = keyboard.Controller()
+
+    def click(self, x, y):
+        self._mouse.position = (x, y)
+        self._mouse.click(self._button, 1)
+
+    def double_click(self, x, y):
+        self._mouse.position = (x, y)
+        self._mouse.click(self._button, 2)
+
+    def write(self, text: str, interval: float = 0.0):
+        if not interval:
+            self._keyboard.type(text)
+            return
+        for char in text:
+            self._keyboard.type(char)
+            time.sleep(interval)
+
+    def hotkey(self, *keys):
+        from pynput.keyboard import Key
+
+        keys = [getattr(Key, _PYNPUT_NAMES.get(key, key), key) if len(key) > 1 else key for key in keys]
+        for key in keys:
+            self._keyboard.press(key)
+        for key in reversed(keys):
+            self._keyboard.release(key)
+
+
+class NullBackend(InputBackend):
+    """No-op backend that only records the actions it was asked to perform"""
+    name = "null"
+
+    def __init__(self):
+        self.actions = []
+
+    def click(self, x, y):
+        self.actions.append(("click", x, y))
+
+    def double_click(self, x, y):
+        self.actions.append(("double_click", x, y))
+
+    def write(self, text: str, interval: float = 0.0):
+        self.actions.append(("write", text))
+
+    def hotkey(self, *keys):
+        self.actions.append(("hotkey",) + keys)
+
+    def paste(self, text: str, settle: float = 0.05):
+        self.actions.append(("paste", text))
+
+
+BACKENDS = {
+    PyAutoGUIBackend.name: PyAutoGUIBackend,
+    PynputBackend.name: PynputBackend,
+    NullBackend.name: NullBackend,
+}
+
+
+def create_backend(name=None, default=DEFAULT_BACKEND):
+    """Create an input backend by name, falling back to $INPUT_BACKEND and then default"""
+    if isinstance(name, InputBackend):
+        return name
+    name = name or os.environ.get(BACKEND_ENV_VAR) or default
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend: {name}. Choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
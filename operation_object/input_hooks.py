@@ -0,0 +1,185 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+# One input event seen by the global hooks
+HookEvent = namedtuple("HookEvent", ["kind", "x", "y", "time"])
+
+CAPTURE = "capture"  # Capture key pressed; x/y is the mouse position at that moment
+CLICK = "click"      # Left mouse button pressed at x/y
+UNDO = "undo"
+ABORT = "abort"
+PAUSE = "pause"      # Pause key toggled `paused`
+
+
+class Aborted(KeyboardInterrupt):
+    """Raised when the abort hotkey stops a run
+
+    It unwinds like Ctrl-C, so no broad except clause swallows it, but
+    callers that can end just the one run (run_plan, the daemon) catch it and
+    report the run as cancelled instead of ending the program.
+    """
+
+
+class InputHookService:
+    """One long-lived pair of global keyboard and mouse hooks shared by every procedure
+
+    The hook callbacks only append events to a SimpleQueue, which needs no
+    Python-level locking, so they never block the platform's input thread.
+    Consumers read the queue; the abort hotkey additionally sets `aborted` and
+    the pause hotkey toggles `paused`, which running workflows check.
+    """
+
+    def __init__(self, capture_key: str = "`", undo_key: str = "backspace", abort_key: str = "esc",
+                 pause_key: str = "f9"):
+        self.capture_key = capture_key
+        self.undo_key = undo_key
+        self.abort_key = abort_key
+        self.pause_key = pause_key
+        self.events = queue.SimpleQueue()
+        self.aborted = threading.Event()
+        self.paused = threading.Event()
+        self._listeners = []
+        self._taps = []
+
+    @property
+    def running(self):
+        return bool(self._listeners) and all(listener.is_alive() for listener in self._listeners)
+
+    def start(self):
+        """Install the hooks once; later calls are no-ops"""
+        if self.running:
+            return self
+        # Imported here so the workflow itself can run without a display
+        from pynput import keyboard, mouse
+
+        self._mouse = mouse.Controller()
+        self._left = mouse.Button.left
+        self._undo = getattr(keyboard.Key, self.undo_key)
+        self._abort = getattr(keyboard.Key, self.abort_key)
+        self._pause = getattr(keyboard.Key, self.pause_key)
+        self._listeners = [
+            keyboard.Listener(on_press=self._on_press, on_release=self._on_release),
+            mouse.Listener(on_click=self._on_click),
+        ]
+        for listener in self._listeners:
+            listener.daemon = True
+            listener.start()
+        return self
+
+    def stop(self):
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+
+    def tap(self, callback):
+        """Also pass every raw event to callback(kind, x, y, key, pressed) until the returned function is called
+
+        kind is "key" (key is the character or the special key's name) or
+        "click" (key is the mouse button's name). Callbacks run on the hook
+        threads and must only hand the event off.
+        """
+        self._taps.append(callback)
+        return lambda: self._taps.remove(callback)
+
+    @staticmethod
+    def _key_name(key):
+        char = getattr(key, "char", None)
+        if char is not None and not char.isprintable():
+            # With Ctrl held, Windows reports control characters (e.g. "\x03" for C); use the key itself
+            vk = getattr(key, "vk", None)
+            if vk is not None and (0x30 <= vk <= 0x39 or 0x41 <= vk <= 0x5A):
+                return chr(vk).lower()
+        return char if char is not None else getattr(key, "name", str(key))
+
+    def _on_release(self, key):
+        for callback in self._taps:
+            callback("key", None, None, self._key_name(key), False)
+
+    def _on_press(self, key):
+        for callback in self._taps:
+            callback("key", None, None, self._key_name(key), True)
+        if getattr(key, "char", None) == self.capture_key:
+            x, y = self._mouse.position
+            self.events.put(HookEvent(CAPTURE, x, y, time.monotonic()))
+        elif key == self._undo:
+            self.events.put(HookEvent(UNDO, None, None, time.monotonic()))
+        elif key == self._abort:
+            self.aborted.set()
+            self.events.put(HookEvent(ABORT, None, None, time.monotonic()))
+        elif key == self._pause:
+            if self.paused.is_set():
+                self.paused.clear()
+            else:
+                self.paused.set()
+            self.events.put(HookEvent(PAUSE, None, None, time.monotonic()))
+
+    def _on_click(self, x, y, button, pressed):
+        for callback in self._taps:
+            callback("click", x, y, button.name, pressed)
+        if pressed and button == self._left:
+            self.events.put(HookEvent(CLICK, x, y, time.monotonic()))
+
+    def drain(self):
+        """Discard events that arrived before the caller started listening"""
+        while True:
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                return
+
+    def next_event(self, kinds, timeout: float = None):
+        """Next event of one of the given kinds, or None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                event = self.events.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if event.kind in kinds:
+                return event
+
+    def capture_one(self, source: str = CAPTURE):
+        """Block until one position is captured; None if aborted"""
+        self.drain()
+        event = self.next_event({source, ABORT})
+        if event.kind == ABORT:
+            self.aborted.clear()
+            return None
+        return event.x, event.y
+
+    def capture_sequence(self, names, record, source: str = CAPTURE, prompt=print):
+        """Capture every name in one pass, calling record(name, x, y) for each
+
+        The undo key steps back to recapture the previous name and the abort key
+        ends the pass. Return the number of names captured when the pass ended.
+        """
+        names = list(names)
+        self.drain()
+        index = 0
+        while index < len(names):
+            display_name = names[index].replace('_', ' ').title()
+            prompt(f"[{index + 1}/{len(names)}] {display_name}")
+            event = self.next_event({source, UNDO, ABORT})
+            if event.kind == ABORT:
+                self.aborted.clear()
+                prompt(f"Calibration aborted after {index} of {len(names)} positions")
+                return index
+            if event.kind == UNDO:
+                if index > 0:
+                    index -= 1
+                    prompt("Undone; capture the previous position again")
+                continue
+            if record(names[index], event.x, event.y):
+                index += 1
+        return index
+
+
+_hooks = InputHookService()
+
+
+def get_hooks():
+    """The process-wide input hook service; call start() before reading events"""
+    return _hooks
@@ -0,0 +1,92 @@
+import time
+from collections import deque, namedtuple
+
+# A request to run one procedure action a number of times
+Job = namedtuple("Job", ["procedure", "action", "repeat"])
+
+# Outcome of a single run of a job
+JobResult = namedtuple("JobResult", ["job", "run", "success", "seconds"])
+
+
+def load_jobs(path):
+    """Read jobs from a TOML file made of [[job]] tables (procedure, action, repeat)"""
+    import toml
+
+    jobs = []
+    for index, entry in enumerate(toml.load(path).get("job", [])):
+        if "procedure" not in entry:
+            raise ValueError(f"Job {index + 1} in {path} has no procedure")
+        repeat = int(entry.get("repeat", 1))
+        if repeat < 1:
+            raise ValueError(f"Job {index + 1} in {path} has repeat < 1")
+        jobs.append(Job(entry["procedure"], entry.get("action", "execute"), repeat))
+    return jobs
+
+
+class JobSummary:
+    """Results of a queue run with throughput figures"""
+
+    def __init__(self):
+        self.results = []
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def succeeded(self):
+        return sum(1 for result in self.results if result.success)
+
+    @property
+    def failed(self):
+        return len(self.results) - self.succeeded
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def report(self):
+        """Human-readable throughput summary"""
+        runs = len(self.results)
+        elapsed = self.elapsed
+        per_hour = runs / elapsed * 3600 if elapsed > 0 else 0.0
+        average = sum(result.seconds for result in self.results) / runs if runs else 0.0
+        lines = [
+            f"Runs: {runs} ({self.succeeded} succeeded, {self.failed} failed)",
+            f"Elapsed: {elapsed:.1f}s, average {average:.1f}s per run, {per_hour:.1f} runs/hour",
+        ]
+        for result in self.results:
+            if not result.success:
+                lines.append(f"  Failed: {result.job.procedure} {result.job.action} (run {result.run})")
+        return "\n".join(lines)
+
+
+class JobQueue:
+    """FIFO queue of jobs executed without prompts"""
+
+    def __init__(self, jobs=()):
+        self._jobs = deque(jobs)
+
+    def put(self, job):
+        self._jobs.append(job)
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def run(self, execute, stop_on_failure: bool = False):
+        """Run every queued job through execute(job) -> bool and return a JobSummary"""
+        summary = JobSummary()
+        while self._jobs:
+            job = self._jobs.popleft()
+            for run in range(1, job.repeat + 1):
+                print(f"\n=== {job.procedure} {job.action} (run {run}/{job.repeat}) ===")
+                start = time.monotonic()
+                try:
+                    success = bool(execute(job))
+                except Exception as e:
+                    print(f"Error running job: {str(e)}")
+                    success = False
+                summary.results.append(JobResult(job, run, success, time.monotonic() - start))
+                if not success and stop_on_failure:
+                    self._jobs.clear()
+                    break
+        summary.finished = time.monotonic()
+        return summary
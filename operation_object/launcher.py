@@ -0,0 +1,158 @@
+import shlex
+import subprocess
+import sys
+from operation_object.clock import SYSTEM_CLOCK
+
+
+class PyGetWindowWindows:
+    """Window lookup through PyGetWindow (full support on Windows, titles only on macOS)"""
+
+    def __init__(self):
+        import pygetwindow
+
+        self._gw = pygetwindow
+
+    def find(self, title):
+        try:
+            return [window for window in self._gw.getWindowsWithTitle(title) if window.title]
+        except (NotImplementedError, AttributeError):
+            # macOS builds only list titles; the app is running but cannot be moved
+            return [name for name in self._gw.getAllTitles() if title in name]
+
+    def focus(self, window):
+        if not isinstance(window, str):
+            window.activate()
+
+    def move(self, window, rect):
+        if not isinstance(window, str):
+            left, top, width, height = rect
+            window.moveTo(left, top)
+            window.resizeTo(width, height)
+
+
+class XlibWindows:
+    """Window lookup through EWMH properties of the X server (python-xlib comes with pynput on Linux)"""
+
+    def __init__(self):
+        from Xlib import X, display
+
+        self._X = X
+        self.display = display.Display()
+        self.root = self.display.screen().root
+
+    def _atom(self, name):
+        return self.display.intern_atom(name)
+
+    def _title(self, window):
+        name = window.get_full_property(self._atom("_NET_WM_NAME"), self._atom("UTF8_STRING"))
+        if name is not None:
+            value = name.value
+            return value.decode("utf-8", "replace") if isinstance(value, bytes) else value
+        return window.get_wm_name() or ""
+
+    def find(self, title):
+        clients = self.root.get_full_property(self._atom("_NET_CLIENT_LIST"), self._X.AnyPropertyType)
+        windows = []
+        for window_id in (clients.value if clients is not None else []):
+            window = self.display.create_resource_object("window", window_id)
+            if title in self._title(window):
+                windows.append(window)
+        return windows
+
+    def focus(self, window):
+        from Xlib import protocol
+
+        event = protocol.event.ClientMessage(
+            window=window, client_type=self._atom("_NET_ACTIVE_WINDOW"),
+            data=(32, [2, self._X.CurrentTime, 0, 0, 0]))
+        mask = self._X.SubstructureRedirectMask | self._X.SubstructureNotifyMask
+        self.root.send_event(event, event_mask=mask)
+        self.display.flush()
+
+    def move(self, window, rect):
+        left, top, width, height = rect
+        window.configure(x=left, y=top, width=width, height=height)
+        self.display.flush()
+
+
+def window_backend():
+    """X properties on Linux, PyGetWindow elsewhere"""
+    return XlibWindows() if sys.platform.startswith("linux") else PyGetWindowWindows()
+
+
+class Launcher:
+    """Starts an application, or reuses a running instance, and waits until its window is ready
+
+    Configured as [apps.<name>]: command (optional; without it the fallback,
+    e.g. double-clicking a desktop icon, starts the app), window_title
+    (substring identifying the ready window), timeout, interval and an
+    optional window = [left, top, width, height] to place it at.
+    """
+
+    def __init__(self, name, spec, clock=SYSTEM_CLOCK, windows=None):
+        self.name = name
+        self.command = spec.get("command", "")
+        self.window_title = spec.get("window_title", "")
+        self.timeout = spec.get("timeout", 60.0)
+        self.interval = spec.get("interval", 0.25)
+        self.window = spec.get("window")
+        self.clock = clock
+        self._windows = windows
+        self.process = None
+
+    @property
+    def detects_readiness(self):
+        return bool(self.window_title)
+
+    @property
+    def windows(self):
+        if self._windows is None:
+            self._windows = window_backend()
+        return self._windows
+
+    def _find(self):
+        found = self.windows.find(self.window_title)
+        return found[0] if found else None
+
+    def _place(self, window):
+        self.windows.focus(window)
+        if self.window:
+            self.windows.move(window, self.window)
+
+    def start(self, fallback=None):
+        """Start the application from its command, or with fallback() if it has none"""
+        if self.command:
+            args = shlex.split(self.command) if isinstance(self.command, str) else list(self.command)
+            self.process = subprocess.Popen(args)
+        elif fallback is not None:
+            fallback()
+        else:
+            raise ValueError(f"App '{self.name}' has no command and no launch position")
+
+    def ensure_running(self, fallback=None):
+        """Make sure the app's window is up, focused and placed; return the seconds spent waiting"""
+        window = self._find()
+        if window is not None:
+            print(f"{self.name} is already running; reusing it")
+            self._place(window)
+            return 0.0
+
+        start = self.clock.now()
+        self.start(fallback)
+        deadline = start + self.timeout
+        while True:
+            window = self._find()
+            if window is not None:
+                self._place(window)
+                return self.clock.now() - start
+            # Launchers such as `open -a` exit cleanly after handing off; only a failure is fatal
+            if self.process is not None and self.process.poll() not in (None, 0):
+                raise RuntimeError(f"{self.name} exited with code {self.process.returncode} before its window appeared")
+            if self.clock.now() >= deadline:
+                raise TimeoutError(f"Timed out after {self.timeout}s waiting for the {self.name} window")
+            self.clock.sleep(self.interval)
+
+
+def load_launchers(apps_config, clock=SYSTEM_CLOCK):
+    """Build Launchers from an [apps.*] config section"""
+    return {name: Launcher(name, spec, clock) for name, spec in (apps_config or {}).items()}
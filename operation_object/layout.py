@@ -0,0 +1,107 @@
+UNSET = -1
+
+
+def current_screen():
+    """Size of the primary screen in the same (logical) units as captured positions"""
+    import pyautogui
+
+    width, height = pyautogui.size()
+    return int(width), int(height)
+
+
+class Layout:
+    """All positions of a procedure as one (N, 2) array plus the screen they were captured on
+
+    The positions stay editable as [positions.*] tables in metadata.toml; the
+    reference screen lives in [layout] as screen = [width, height].
+    """
+
+    def __init__(self, names, coords, screen=None):
+        import numpy as np
+
+        self.names = list(names)
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(len(self.names), 2)
+        self.screen = tuple(screen) if screen else None
+
+    @classmethod
+    def from_config(cls, config):
+        positions = config.get("positions", {})
+        names = list(positions)
+        coords = [(positions[name].get("x", UNSET), positions[name].get("y", UNSET)) for name in names]
+        return cls(names, coords, config.get("layout", {}).get("screen"))
+
+    @property
+    def set_mask(self):
+        """Rows whose position has been captured"""
+        return (self.coords != UNSET).all(axis=1)
+
+    def apply_to(self, config):
+        """Write the coordinates and reference screen back into a parsed config"""
+        for name, (x, y) in zip(self.names, self.coords.tolist()):
+            config["positions"][name]["x"] = x
+            config["positions"][name]["y"] = y
+        if self.screen is not None:
+            config.setdefault("layout", {})["screen"] = list(self.screen)
+
+    def transform(self, matrix):
+        """Apply a 2x3 affine matrix to every captured position at once"""
+        import numpy as np
+
+        matrix = np.asarray(matrix, dtype=np.float64)
+        mask = self.set_mask
+        self.coords[mask] = self.coords[mask] @ matrix[:, :2].T + matrix[:, 2]
+
+    def rescale_to(self, screen):
+        """Map positions from the reference screen onto a screen of another size"""
+        width, height = self.screen
+        new_width, new_height = screen
+        self.transform([[new_width / width, 0.0, 0.0], [0.0, new_height / height, 0.0]])
+        self.screen = tuple(screen)
+
+    def point(self, name):
+        return tuple(self.coords[self.names.index(name)].tolist())
+
+
+def fit_two_points(reference, measured):
+    """Per-axis scale and offset mapping two reference points onto their new positions, as a 2x3 matrix"""
+    (x1, y1), (x2, y2) = reference
+    (u1, v1), (u2, v2) = measured
+    if x1 == x2 or y1 == y2:
+        raise ValueError("Reference points must differ in both x and y")
+    scale_x = (u2 - u1) / (x2 - x1)
+    scale_y = (v2 - v1) / (y2 - y1)
+    return [[scale_x, 0.0, u1 - scale_x * x1], [0.0, scale_y, v1 - scale_y * y1]]
+
+
+def reference_pair(layout):
+    """The two captured positions farthest apart, which give the best-conditioned two-point fit"""
+    import numpy as np
+
+    indices = np.flatnonzero(layout.set_mask)
+    if len(indices) < 2:
+        raise ValueError("At least two positions must be captured to recalibrate")
+    coords = layout.coords[indices]
+    # Span in the weaker axis decides how well both scales are determined
+    spans = np.minimum(np.abs(coords[:, None, 0] - coords[None, :, 0]),
+                       np.abs(coords[:, None, 1] - coords[None, :, 1]))
+    first, second = np.unravel_index(spans.argmax(), spans.shape)
+    return layout.names[indices[first]], layout.names[indices[second]]
+
+
+def adapt_to_screen(config, screen=None):
+    """Rescale the config's positions if the screen differs from the reference; return True if changed
+
+    A config without a reference screen is stamped with the current one.
+    """
+    screen = tuple(screen or current_screen())
+    layout = Layout.from_config(config)
+    if layout.screen == screen:
+        return False
+    if layout.screen is not None:
+        print(f"Screen changed from {layout.screen[0]}x{layout.screen[1]} to {screen[0]}x{screen[1]}; "
+              f"rescaling {int(layout.set_mask.sum())} positions")
+        layout.rescale_to(screen)
+    else:
+        layout.screen = screen
+    layout.apply_to(config)
+    return True
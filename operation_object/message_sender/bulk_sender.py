@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+import os
+import sys
+from itertools import islice
+from operation_object.clock import SYSTEM_CLOCK
+from operation_object.config_store import atomic_write
+from operation_object.input_hooks import Aborted, get_hooks
+from operation_object.retry import RunResult
+
+STDIN = "-"
+
+
+def read_records(source, text_field: str = "message"):
+    """Lazily yield one dict per record of a .csv or .jsonl file, or of stdin ("-", JSONL or plain lines)
+
+    A malformed line yields a ValueError in its place, so that one bad record
+    fails on its own and the offsets of the following records stay correct.
+    """
+    if source == STDIN:
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+        yield from _parse_lines(stream, text_field)
+        return
+
+    with open(source, newline="", encoding="utf-8") as f:
+        if source.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            yield from _parse_lines(f, text_field)
+
+
+def _parse_lines(lines, text_field):
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        # JSON objects become records; anything else is taken as the message itself
+        if not line.startswith("{"):
+            yield {text_field: line}
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"line {number} is not valid JSON: {str(e)}")
+            continue
+        yield record if isinstance(record, dict) else ValueError(f"line {number} is not a JSON object")
+
+
+class RecordFields(dict):
+    """Record mapping for format_map where empty CSV cells (None) count as missing fields"""
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+class TokenBucket:
+    """Allows `rate` sends per second on average, with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1, clock=SYSTEM_CLOCK):
+        if rate < 0:
+            raise ValueError(f"The send rate must not be negative, got {rate}")
+        if burst < 1:
+            # A bucket that holds less than one token never lets a send through
+            raise ValueError(f"The burst must be at least 1, got {burst}")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock.now()
+
+    def acquire(self):
+        """Block until a token is available and take it; a rate of 0 means unlimited"""
+        if not self.rate:
+            return
+        while True:
+            now = self.clock.now()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            self.clock.sleep((1 - self.tokens) / self.rate)
+
+
+class BulkCheckpoint:
+    """Offset of the next unsent record of a source, so an interrupted send can resume"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def offset_for(self, source):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        return state["offset"] if state.get("source") == os.path.abspath(source) else 0
+
+    def save(self, source, offset, sent, failed):
+        atomic_write(self.path, json.dumps({
+            "source": os.path.abspath(source),
+            "offset": offset,
+            "sent": sent,
+            "failed": failed,
+        }, indent=2))
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BulkSender:
+    """Sends every record of a source through a template stage of the sender's workflow
+
+    The template stage (bulk_stage, default [stage.bulk_message]) uses the
+    configured positions and delays; "{field}" placeholders in its type steps
+    are filled from each record.
+    """
+
+    def __init__(self, sender, source, rate: float = None, burst: int = None, report_every: float = 1.0):
+        configuration = sender.config["configuration"]
+        self.engine = sender.engine
+        self.source = source
+        self.stage = configuration.get("bulk_stage", "bulk_message")
+        self.text_field = configuration.get("bulk_text_field", "message")
+        self.bucket = TokenBucket(
+            configuration.get("bulk_rate", 1.0) if rate is None else rate,
+            configuration.get("bulk_burst", 1) if burst is None else burst,
+            self.engine.clock,
+        )
+        self.checkpoint_every = configuration.get("bulk_checkpoint_every", 50)
+        self.checkpoint = BulkCheckpoint(os.path.join(os.path.dirname(sender.store.path), "bulk_checkpoint.json"))
+        self.report_every = report_every
+        self.sent = self.failed = 0
+
+    def send(self, record, template):
+        """Perform the template actions with the record's fields filled in
+
+        Every placeholder is filled before the first action, so a record with a
+        missing field fails without clicking anything.
+        """
+        actions = []
+        for action in template:
+            if action.text is not None:
+                try:
+                    action = action._replace(text=action.text.format_map(RecordFields(record)))
+                except KeyError as e:
+                    raise ValueError(f"record has no field '{e.args[0]}'")
+            actions.append(action)
+        for action in actions:
+            self.engine.perform(action)
+
+    def _report(self, start, position, final=False):
+        elapsed = self.engine.clock.now() - start
+        rate = self.sent / elapsed if elapsed > 0 else 0.0
+        end = "\n" if final else ""
+        print(f"\rRecord {position}: sent {self.sent}, failed {self.failed}, {rate:.2f} sent/s", end=end, flush=True)
+
+    def _save(self, position):
+        if self.source != STDIN:
+            self.checkpoint.save(self.source, position, self.sent, self.failed)
+
+    def run(self, resume: bool = False):
+        """Send all records, skipping those a previous run already handled when resuming; return True if none failed"""
+        template = self.engine.compile_stage(self.stage)
+        policy = self.engine.stage_policies.get(self.stage)
+        position = self.checkpoint.offset_for(self.source) if resume and self.source != STDIN else 0
+        if position:
+            print(f"Resuming at record {position}")
+
+        hooks = get_hooks()
+        hooks.aborted.clear()
+        result = RunResult()
+        clock = self.engine.clock
+        start = last_report = clock.now()
+        try:
+            for record in islice(read_records(self.source, self.text_field), position, None):
+                if hooks.aborted.is_set():
+                    raise Aborted(f"Aborted by hotkey at record {position}")
+                if isinstance(record, ValueError):
+                    self.failed += 1
+                    print(f"\nSkipping record {position}: {str(record)}")
+                else:
+                    self.bucket.acquire()
+                    try:
+                        self.engine.attempt(self.stage, policy, lambda: self.send(record, template), result)
+                        self.sent += 1
+                    except Exception as e:
+                        self.failed += 1
+                        print(f"\nError sending record {position}: {str(e)}")
+                position += 1
+
+                if position % self.checkpoint_every == 0:
+                    self._save(position)
+                if clock.now() - last_report >= self.report_every:
+                    self._report(start, position)
+                    last_report = clock.now()
+        except BaseException:
+            # Keep the offset of the first unsent record for --resume
+            self._save(position)
+            self._report(start, position, final=True)
+            raise
+
+        self._report(start, position, final=True)
+        self.checkpoint.clear()
+        return self.failed == 0
@@ -1,20 +1,30 @@
-from pyautogui import write, doubleClick
 from datetime import datetime
-import time
-import toml
 import os
+from operation_object.input_backend import create_backend, DEFAULT_BACKEND
+from operation_object.config_store import ConfigStore
+from operation_object.workflow import WorkflowEngine
+from operation_object.async_runner import run_plan
+from operation_object.layout import adapt_to_screen, current_screen
 
 class MessageSender:
-    def __init__(self):
+    def __init__(self, backend=None):
         """Initialize the MessageSender with configuration"""
         try:
             # Get the directory where this script is located
             current_dir = os.path.dirname(os.path.abspath(__file__))
             config_path = os.path.join(current_dir, "metadata.toml")
             
-            self.config = toml.load(config_path)
+            self.store = ConfigStore(config_path)
+            self.config = self.store.load()
             self.delay = self.config["configuration"]["default_delay"]
             self.position = self.config["positions"]["icon_position"]
+
+            # Input backend: explicit argument, then $INPUT_BACKEND, then metadata.toml
+            self.backend = create_backend(
+                backend, self.config["configuration"].get("input_backend", DEFAULT_BACKEND))
+
+            # Stages and steps come from the [workflow] and [stage.*] sections
+            self.engine = WorkflowEngine(self.config, current_dir, self.backend)
         except Exception as e:
             print(f"Error loading configuration: {str(e)}")
             raise
@@ -30,7 +40,7 @@ class MessageSender:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
             # Prepare the log entry
-            log_entry = f"[{timestamp}] Position reset - x: {self.position['x']}, y: {self.position['y']}\n"
+            log_entry = f"[{timestamp}] Position reset - x: {self.position.get('x', -1)}, y: {self.position.get('y', -1)}\n"
             
             # Append to legacy file
             with open(legacy_file, "a") as f:
@@ -43,10 +53,8 @@ class MessageSender:
             # Update the position in config
             self.config["positions"]["icon_position"] = self.position
             
-            # Save updated position to config file
-            config_path = os.path.join(current_dir, "metadata.toml")
-            with open(config_path, "w") as f:
-                toml.dump(self.config, f)
+            # Save updated config atomically
+            self.store.save(self.config)
             
             print("Position has been reset and previous position logged")
             return True
@@ -60,14 +68,12 @@ class MessageSender:
             self.position["x"] = x
             self.position["y"] = y
             
-            # Update the position in config
+            # Update the position in config, with the screen it belongs to
             self.config["positions"]["icon_position"] = self.position
+            self.config.setdefault("layout", {})["screen"] = list(current_screen())
             
-            # Save updated position to config file using the correct path
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            config_path = os.path.join(current_dir, "metadata.toml")
-            with open(config_path, "w") as f:
-                toml.dump(self.config, f)
+            # Save updated config atomically
+            self.store.save(self.config)
             
             print(f"Position captured: ({x}, {y})")
             return True
@@ -75,27 +81,35 @@ class MessageSender:
             print(f"Error during position capture: {str(e)}")
             return False
 
-    def execute(self):
-        """Execute the workflow sequence"""
-        try:
-            # Validate position
-            if self.position["x"] == -1 or self.position["y"] == -1:
-                raise ValueError("Position not set. Please capture position first.")
-
-            # Step 1: Move to position and double click
-            doubleClick(x=self.position["x"], y=self.position["y"])
-            time.sleep(self.delay)
-            time.sleep(1)
+    def adapt_layout(self):
+        """Rescale the position in memory if the screen geometry changed since it was captured
 
-            # Step 2: Input '1' for random data selection
-            write('1\n')
-            time.sleep(self.delay)
+        Nothing is saved: display pool profiles and other screens sharing this
+        metadata.toml keep their own coordinates. Calibration stores the screen.
+        """
+        if self.backend.name == "null":
+            return True  # Nothing is clicked on a real screen
+        try:
+            adapt_to_screen(self.config)
+            return True
+        except Exception as e:
+            print(f"Error checking screen layout: {str(e)}")
+            return False
 
-            # Step 3: Input 's' to start execution
-            write('s\n')
+    def execute(self, resume: bool = False):
+        """Execute the workflow sequence, optionally resuming after the last completed stage"""
+        try:
+            # Follow screen geometry changes, then validate every stage before the first action
+            self.adapt_layout()
+            plan = self.engine.compile()
+            self.engine.injector.reset()
+            success = run_plan(self.engine, plan, resume=resume)
 
-            return True
+            injector = self.engine.injector
+            typed = sum(chars for chars, _ in injector.totals.values())
+            if typed:
+                print(f"Sent {typed} characters at {injector.chars_per_second():.0f} chars/s")
+            return success
         except Exception as e:
             print(f"Error during execution: {str(e)}")
             return False
-            
\ No newline at end of file
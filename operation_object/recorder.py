@@ -0,0 +1,237 @@
+import json
+import os
+import queue
+import time
+from operation_object.clock import SYSTEM_CLOCK
+from operation_object.config_store import atomic_write
+from operation_object.input_backend import backend_key_name
+from operation_object.input_hooks import Aborted, get_hooks
+from operation_object.waiters import ScreenSettled, grab_region, wait_until
+
+# Event kinds stored in a trace
+CLICK = 1   # Mouse button press at x/y; code indexes the key table ("left", "right", ...)
+KEY = 2     # Key press; code indexes the key table (a character or a pyautogui key name)
+HOTKEY = 3  # Key pressed while modifiers were held; the key table entry is e.g. "ctrl+c"
+
+MODIFIERS = ("ctrl", "ctrl_l", "ctrl_r", "alt", "alt_l", "alt_r", "alt_gr", "cmd", "cmd_l", "cmd_r")
+
+# Keys that end a recording rather than being recorded
+STOP_KEY = "esc"
+
+
+def trace_dtype():
+    """One fixed-size record per event: seconds since the start, kind, position and key table index"""
+    import numpy as np
+
+    return np.dtype([("t", "<f8"), ("kind", "u1"), ("x", "<f4"), ("y", "<f4"), ("code", "<i4")])
+
+
+def header_path(path):
+    return path + ".json"
+
+
+def load_trace(path):
+    """(header, events) where events is a read-only memmap of the trace records"""
+    import numpy as np
+
+    with open(header_path(path)) as f:
+        header = json.load(f)
+    size = os.path.getsize(path) // trace_dtype().itemsize
+    if size == 0:
+        return header, np.empty(0, dtype=trace_dtype())
+    return header, np.memmap(path, dtype=trace_dtype(), mode="r", shape=(size,))
+
+
+class Recorder:
+    """Records a manual session from the shared input hooks into a binary trace
+
+    Hook callbacks only queue the raw events; record() turns them into fixed-size
+    records in a preallocated block and appends full blocks to the trace file,
+    so long sessions never accumulate per-event Python objects.
+    """
+
+    def __init__(self, path, block: int = 4096, hooks=None):
+        import numpy as np
+
+        self.path = path
+        self.hooks = hooks or get_hooks()
+        self.events = queue.SimpleQueue()
+        self.keys = {}
+        self.buffer = np.zeros(block, dtype=trace_dtype())
+        self.count = 0
+        self.written = 0
+        self._held = set()
+
+    def _code(self, name):
+        if name not in self.keys:
+            self.keys[name] = len(self.keys)
+        return self.keys[name]
+
+    def _add(self, f, t, kind, x, y, name):
+        self.buffer[self.count] = (t, kind, x or 0.0, y or 0.0, self._code(name))
+        self.count += 1
+        if self.count == len(self.buffer):
+            self._flush(f)
+
+    def _flush(self, f):
+        self.buffer[:self.count].tofile(f)
+        self.written += self.count
+        self.count = 0
+        f.flush()
+
+    def record(self, on_event=None):
+        """Record until the stop key (Esc) is pressed; return the number of events written"""
+        self.hooks.start()
+        remove = self.hooks.tap(lambda *event: self.events.put((time.monotonic(),) + event))
+        start = time.monotonic()
+        try:
+            with open(self.path, "wb") as f:
+                while True:
+                    stamp, kind, x, y, name, pressed = self.events.get()
+                    if kind == "click":
+                        if pressed:
+                            self._add(f, stamp - start, CLICK, x, y, name)
+                    elif not pressed:
+                        self._held.discard(name)
+                    elif name == STOP_KEY:
+                        break
+                    elif name in MODIFIERS:
+                        self._held.add(name)
+                    elif backend_key_name(name) is None:
+                        # Stored under a name the backends cannot press, it would silently vanish on replay
+                        print(f"Not recording unsupported key {name!r}")
+                    elif self._held:
+                        modifiers = {backend_key_name(modifier.split("_")[0]) for modifier in self._held}
+                        combo = "+".join(sorted(modifiers) + [backend_key_name(name)])
+                        self._add(f, stamp - start, HOTKEY, None, None, combo)
+                    else:
+                        self._add(f, stamp - start, KEY, None, None, backend_key_name(name))
+                    if on_event is not None:
+                        on_event(self.written + self.count)
+                self._flush(f)
+        finally:
+            remove()
+            self.hooks.aborted.clear()  # The stop key is also the abort hotkey
+
+        keys = sorted(self.keys, key=self.keys.get)
+        atomic_write(header_path(self.path), json.dumps({"version": 1, "keys": keys}, indent=2))
+        return self.written
+
+
+class Player:
+    """Replays a trace through an input backend with the recorded gaps compressed
+
+    Each gap is divided by speed and capped at max_gap. Gaps longer than
+    ready_after seconds, where the human was waiting for the application,
+    call ready() instead (e.g. a screen wait) when one is given.
+    """
+
+    def __init__(self, backend, max_gap: float = 0.5, speed: float = 1.0, ready_after: float = None, ready=None,
+                 key_interval: float = 0.0, clock=SYSTEM_CLOCK, block: int = 4096, hooks=None):
+        self.backend = backend
+        self.max_gap = max_gap
+        self.speed = speed
+        self.ready_after = ready_after
+        self.ready = ready
+        self.key_interval = key_interval
+        self.clock = clock
+        self.block = block
+        self.hooks = hooks or get_hooks()
+
+    def _pause(self, gap):
+        if self.ready is not None and self.ready_after is not None and gap > self.ready_after:
+            self.ready()
+            return
+        seconds = min(gap / self.speed, self.max_gap)
+        if seconds > 0:
+            self.clock.sleep(seconds)
+
+    def play(self, path):
+        """Replay every event of a trace; return (events, recorded seconds, replayed seconds)"""
+        import numpy as np
+
+        header, events = load_trace(path)
+        keys = header["keys"]
+        self.hooks.aborted.clear()
+        start = self.clock.now()
+        previous = 0.0
+        for offset in range(0, len(events), self.block):
+            block = np.asarray(events[offset:offset + self.block])
+            gaps = np.diff(block["t"], prepend=previous)
+            previous = float(block["t"][-1])
+            for gap, kind, x, y, code in zip(gaps.tolist(), block["kind"].tolist(), block["x"].tolist(),
+                                             block["y"].tolist(), block["code"].tolist()):
+                self._pause(gap)
+                if self.hooks.aborted.is_set():
+                    raise Aborted("Aborted by hotkey")
+                name = keys[code]
+                if kind == CLICK:
+                    if name == "left":
+                        self.backend.click(x, y)
+                elif kind == HOTKEY:
+                    # "ctrl++" presses ctrl and the plus key
+                    combo = name[:-2].split("+") + ["+"] if name.endswith("++") else name.split("+")
+                    self.backend.hotkey(*combo)
+                elif len(name) == 1:
+                    self.backend.write(name, interval=self.key_interval)
+                else:
+                    self.backend.hotkey(name)
+        recorded = float(events["t"][-1]) if len(events) else 0.0
+        return len(events), recorded, self.clock.now() - start
+
+
+def settled_screen(timeout: float = 10.0, interval: float = 0.2, grab=grab_region, clock=SYSTEM_CLOCK):
+    """Readiness check for Player: wait until the screen stops changing (at most timeout seconds)"""
+    def ready():
+        condition = ScreenSettled()
+        condition.arm(grab)
+        clock.sleep(interval)
+        wait_until(condition, timeout, interval, grab, clock)
+    return ready
+
+
+def trace_to_stage(path, stage_name: str, long_gap: float = 2.0):
+    """Turn a trace into [workflow], [positions.*] and [[stage.<name>.steps]] tables for a new procedure
+
+    Left clicks become click steps on one position per distinct spot (a click repeated at the same spot within
+    0.5 s becomes a double_click), consecutive characters are merged into one
+    type step and gaps longer than long_gap become wait steps. Saved as
+    operation_object/<procedure>/metadata.toml, the tables run as they are.
+    """
+    header, events = load_trace(path)
+    keys = header["keys"]
+    positions = {}
+    spots = {}
+    steps = []
+    previous_t = 0.0
+    for t, kind, x, y, code in zip(events["t"].tolist(), events["kind"].tolist(), events["x"].tolist(),
+                                   events["y"].tolist(), events["code"].tolist()):
+        name = keys[code]
+        gap = t - previous_t
+        previous_t = t
+        if gap > long_gap:
+            steps.append({"action": "wait", "seconds": round(gap, 1)})
+        last = steps[-1] if steps else None
+
+        if kind == CLICK:
+            if name != "left":
+                continue
+            x, y = int(round(x)), int(round(y))
+            if (last is not None and last["action"] == "click" and gap < 0.5
+                    and spots.get((x, y)) == last["position"]):
+                last["action"] = "double_click"
+                continue
+            position = spots.get((x, y))
+            if position is None:
+                position = spots[(x, y)] = f"{stage_name}_position_{len(positions) + 1}"
+                positions[position] = {"x": x, "y": y}
+            steps.append({"action": "click", "position": position})
+        elif kind == KEY and (len(name) == 1 or name == "enter"):
+            char = "\n" if name == "enter" else name
+            if last is not None and last["action"] == "type":
+                last["text"] += char
+            else:
+                steps.append({"action": "type", "text": char})
+        else:
+            print(f"Skipped {name} at {t:.1f}s: workflow steps cannot press special keys yet")
+    return {"workflow": {"stages": [stage_name]}, "stage": {stage_name: {"steps": steps}}, "positions": positions}
@@ -0,0 +1,107 @@
+import importlib
+import json
+import os
+from operation_object.config_store import atomic_write
+
+# Directory holding one sub-package per procedure, each with a metadata.toml
+PROCEDURES_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(PROCEDURES_DIR, ".procedure_index.json")
+
+
+class Procedure:
+    """A discovered procedure; its module is only imported by load()
+
+    Without a module and class in [procedure], the generic WorkflowProcedure
+    runs the directory's [workflow] and [stage.*] sections.
+    """
+
+    def __init__(self, key, manifest, base_dir=None):
+        self.key = key
+        self.name = manifest.get("name", key.replace('_', ' ').title())
+        self.module = manifest.get("module")
+        self.class_name = manifest.get("class")
+        self.order = manifest.get("order", 0)
+        self.stages = manifest.get("stages", [])
+        self.base_dir = base_dir
+        self._cls = None
+
+    def load(self):
+        """Import the procedure's module and return its operation object class"""
+        if self._cls is None:
+            if self.module is None:
+                from operation_object.workflow_procedure import WorkflowProcedure
+
+                class_name = "".join(part.title() for part in self.key.split("_"))
+                self._cls = WorkflowProcedure.for_directory(self.base_dir, class_name)
+            else:
+                module = importlib.import_module(self.module)
+                self._cls = getattr(module, self.class_name)
+        return self._cls
+
+
+def _read_manifest(metadata_path):
+    import toml
+
+    config = toml.load(metadata_path)
+    manifest = dict(config.get("procedure", {}))
+    manifest["stages"] = config.get("workflow", {}).get("stages", [])
+    return manifest
+
+
+def _load_index(index_path):
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def discover(root=PROCEDURES_DIR, index_path=INDEX_FILE):
+    """Find procedures under root, re-parsing only metadata.toml files whose mtime changed"""
+    index = _load_index(index_path)
+    fresh = {}
+    for key in sorted(os.listdir(root)):
+        metadata_path = os.path.join(root, key, "metadata.toml")
+        if not os.path.isfile(metadata_path):
+            continue
+        stat = os.stat(metadata_path)
+        signature = [stat.st_mtime_ns, stat.st_size]
+
+        entry = index.get(key)
+        if entry is None or entry["signature"] != signature:
+            entry = {"signature": signature, "manifest": _read_manifest(metadata_path)}
+        fresh[key] = entry
+
+    if fresh != index:
+        try:
+            atomic_write(index_path, json.dumps(fresh, indent=2, sort_keys=True))
+        except OSError:
+            pass  # A read-only install simply re-parses next time
+
+    procedures = []
+    for key, entry in fresh.items():
+        manifest = entry["manifest"]
+        if ("module" not in manifest or "class" not in manifest) and not manifest["stages"]:
+            continue  # Neither Python of its own nor a workflow to run
+        procedures.append(Procedure(key, manifest, os.path.join(root, key)))
+    return sorted(procedures, key=lambda p: (p.order, p.name))
+
+
+class Registry:
+    """Lazily loaded procedures, in menu order"""
+
+    def __init__(self, root=PROCEDURES_DIR, index_path=INDEX_FILE):
+        self.procedures = discover(root, index_path)
+        self._by_key = {p.key: p for p in self.procedures}
+
+    def __iter__(self):
+        return iter(self.procedures)
+
+    def __len__(self):
+        return len(self.procedures)
+
+    def get(self, key):
+        """Look up a procedure by its directory name"""
+        if key not in self._by_key:
+            raise KeyError(f"Unknown procedure: {key}. Available: {', '.join(self._by_key)}")
+        return self._by_key[key]
@@ -0,0 +1,57 @@
+from collections import namedtuple
+
+# Retry settings for a stage or a single step; recovery is a list of compiled Actions
+RetryPolicy = namedtuple("RetryPolicy", ["attempts", "backoff", "multiplier", "max_backoff", "recovery"])
+
+# Keys accepted in a [stage.<name>.retry] or [stage.<name>.steps.retry] table
+POLICY_KEYS = {"attempts", "backoff", "multiplier", "max_backoff", "recovery"}
+
+
+def parse_policy(spec, label, errors):
+    """Validate a retry table; recovery steps are compiled separately by the engine"""
+    unknown = set(spec) - POLICY_KEYS
+    if unknown:
+        errors.append(f"{label}: unknown retry settings {', '.join(sorted(unknown))}")
+    attempts = spec.get("attempts", 1)
+    if not isinstance(attempts, int) or attempts < 1:
+        errors.append(f"{label}: retry attempts must be a positive integer")
+        attempts = 1
+    return RetryPolicy(
+        attempts=attempts,
+        backoff=float(spec.get("backoff", 1.0)),
+        multiplier=float(spec.get("multiplier", 2.0)),
+        max_backoff=float(spec.get("max_backoff", 30.0)),
+        recovery=[],
+    )
+
+
+def backoff_delay(policy, attempt: int):
+    """Exponential backoff before the attempt after `attempt` (1-based)"""
+    return min(policy.max_backoff, policy.backoff * policy.multiplier ** (attempt - 1))
+
+
+class RunResult:
+    """Outcome of one workflow run, including every attempt made per stage and retried step"""
+
+    def __init__(self):
+        self.success = False
+        self.failed_stage = None
+        self.error = None
+        self.cancelled = False  # Stopped by the abort hotkey
+        self.attempts = {}
+        self.recoveries = 0
+
+    def count(self, key):
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+
+    @property
+    def retries(self):
+        return sum(count - 1 for count in self.attempts.values())
+
+    def report(self):
+        """One line naming every stage or step that needed more than one attempt, e.g. for the run's log"""
+        retried = [f"{key} ({count} attempts)" for key, count in self.attempts.items() if count > 1]
+        line = f"Retries during this run: {self.retries} - {', '.join(retried)}"
+        if self.recoveries:
+            line += f"; recovery steps ran {self.recoveries} time{'s' if self.recoveries != 1 else ''}"
+        return line
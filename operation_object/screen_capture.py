@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+from operation_object.waiters import grab_region
+from operation_object.delay_profile import percentile
+
+
+class FrameRing:
+    """Preallocated ring buffer of grayscale frames for one screen region
+
+    Frames are views into the ring and stay valid until the ring wraps around,
+    i.e. for depth - 1 further captures; copy them to keep them longer.
+    """
+
+    def __init__(self, region, depth: int):
+        self.region = region
+        self.depth = depth
+        self.frames = None  # Allocated on the first capture, once the pixel size is known
+        self.timestamps = [0.0] * depth
+        self.seq = -1
+
+    def store(self, image, timestamp: float):
+        import numpy as np
+
+        pixels = np.asarray(image)
+        if self.frames is None or self.frames.shape[1:] != pixels.shape:
+            self.frames = np.empty((self.depth,) + pixels.shape, dtype=np.uint8)
+        slot = (self.seq + 1) % self.depth
+        self.frames[slot] = pixels
+        self.timestamps[slot] = timestamp
+        self.seq += 1  # Publish only after the slot is fully written
+
+    def latest(self):
+        """(seq, timestamp, read-only view) of the newest frame, or None before the first capture"""
+        seq = self.seq
+        if seq < 0:
+            return None
+        slot = seq % self.depth
+        view = self.frames[slot]
+        view.flags.writeable = False
+        return seq, self.timestamps[slot], view
+
+
+class CaptureService:
+    """Captures registered screen regions at a fixed rate on a background thread
+
+    Screen-reading features share it through grab(), which has the same
+    signature as waiters.grab_region: registered regions are served from the
+    ring buffer without copying, anything else is captured directly.
+    """
+
+    def __init__(self, rate: float = 20.0, depth: int = 8, grab=grab_region, history: int = 200):
+        self.interval = 1.0 / rate
+        self.depth = depth
+        self._grab = grab
+        self.rings = {}
+        self.latencies = deque(maxlen=history)
+        self.overruns = 0
+        self.direct = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._captured = threading.Condition()
+
+    @classmethod
+    def from_config(cls, configuration, grab=grab_region):
+        """Build from capture_* keys of [configuration]; None when capture_rate is 0 or unset"""
+        rate = configuration.get("capture_rate", 0)
+        if not rate:
+            return None
+        return cls(rate=rate, depth=configuration.get("capture_depth", 8), grab=grab)
+
+    def register(self, region):
+        """Add a (left, top, width, height) region to the capture loop"""
+        region = tuple(region)
+        if region not in self.rings:
+            self.rings[region] = FrameRing(region, self.depth)
+        return region
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running or not self.rings:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="screen-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            cycle_start = time.perf_counter()
+            for ring in list(self.rings.values()):
+                start = time.perf_counter()
+                try:
+                    image = self._grab(ring.region).convert("L")
+                except Exception as e:
+                    print(f"Error capturing region {ring.region}: {str(e)}")
+                    continue
+                ring.store(image, start)
+                self.latencies.append(time.perf_counter() - start)
+            with self._captured:
+                self._captured.notify_all()
+
+            remaining = self.interval - (time.perf_counter() - cycle_start)
+            if remaining < 0:
+                self.overruns += 1  # The regions take longer to capture than the configured rate allows
+            else:
+                self._stop.wait(remaining)
+
+    def frame(self, region, after: float = None, timeout: float = 1.0):
+        """Newest (seq, timestamp, view) of a registered region, optionally captured no earlier than after"""
+        ring = self.rings[tuple(region)]
+        deadline = time.perf_counter() + timeout
+        with self._captured:
+            while True:
+                latest = ring.latest()
+                if latest is not None and (after is None or latest[1] >= after):
+                    return latest
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self.running:
+                    return latest
+                self._captured.wait(remaining)
+
+    def grab(self, region=None):
+        """Drop-in for grab_region: a frame captured after the call, as a PIL image sharing the ring's memory"""
+        from PIL import Image
+
+        key = tuple(region) if region is not None else None
+        if key not in self.rings or not self.running:
+            self.direct += 1
+            return self._grab(region)
+
+        latest = self.frame(key, after=time.perf_counter(), timeout=max(1.0, 4 * self.interval))
+        if latest is None:
+            self.direct += 1
+            return self._grab(region)
+        pixels = latest[2]
+        height, width = pixels.shape
+        return Image.frombuffer("L", (width, height), pixels, "raw", "L", 0, 1)
+
+    def stats(self):
+        """Capture latency in milliseconds and loop health"""
+        samples = list(self.latencies)
+        if not samples:
+            return {"frames": 0, "overruns": self.overruns, "direct": self.direct}
+        return {
+            "frames": sum(ring.seq + 1 for ring in self.rings.values()),
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "max_ms": round(max(samples) * 1000, 2),
+            "overruns": self.overruns,
+            "direct": self.direct,
+        }
@@ -0,0 +1,75 @@
+import time
+from collections import namedtuple
+
+# Outcome of one injected text
+Injection = namedtuple("Injection", ["strategy", "chars", "seconds"])
+
+KEYS = "keys"
+PASTE = "paste"
+
+
+class TextInjector:
+    """Sends text as key events when short and through the clipboard when long
+
+    Key events cost one input event (plus any interval) per character; a paste
+    costs the same few events whatever the length. Trailing newlines are always
+    sent as key presses, since many applications submit on Enter but not on a
+    pasted line break.
+    """
+
+    def __init__(self, backend, paste_threshold: int = 64, key_interval: float = 0.0,
+                 paste_chunk: int = 0, paste_interval: float = 0.05):
+        self.backend = backend
+        self.paste_threshold = paste_threshold
+        self.key_interval = key_interval
+        self.paste_chunk = paste_chunk
+        self.paste_interval = paste_interval
+        self.reset()
+
+    def reset(self):
+        """Start counting chars/s afresh, e.g. for the next run of a warm engine"""
+        self.totals = {KEYS: [0, 0.0], PASTE: [0, 0.0]}  # strategy -> [chars, seconds]
+
+    @classmethod
+    def from_config(cls, backend, configuration):
+        """Build from the paste_* and key_interval keys of [configuration]"""
+        return cls(
+            backend,
+            paste_threshold=configuration.get("paste_threshold", 64),
+            key_interval=configuration.get("key_interval", 0.0),
+            paste_chunk=configuration.get("paste_chunk", 0),
+            paste_interval=configuration.get("paste_interval", 0.05),
+        )
+
+    def strategy_for(self, text: str):
+        """KEYS or PASTE for a payload; a threshold of 0 disables pasting"""
+        if self.paste_threshold and len(text.rstrip("\n")) >= self.paste_threshold:
+            return PASTE
+        return KEYS
+
+    def inject(self, text: str, strategy: str = None):
+        """Send text with the given or the size-based strategy and return an Injection"""
+        strategy = strategy or self.strategy_for(text)
+        start = time.perf_counter()
+        if strategy == KEYS:
+            self.backend.write(text, interval=self.key_interval)
+        else:
+            body = text.rstrip("\n")
+            size = self.paste_chunk or len(body)
+            for offset in range(0, len(body), size):
+                # Every paste waits paste_interval for the application to read the clipboard
+                self.backend.paste(body[offset:offset + size], settle=self.paste_interval)
+            if len(text) > len(body):
+                self.backend.write(text[len(body):], interval=self.key_interval)
+
+        seconds = time.perf_counter() - start
+        self.totals[strategy][0] += len(text)
+        self.totals[strategy][1] += seconds
+        return Injection(strategy, len(text), seconds)
+
+    def chars_per_second(self, strategy: str = None):
+        """Throughput so far, for one strategy or overall"""
+        strategies = [strategy] if strategy else list(self.totals)
+        chars = sum(self.totals[name][0] for name in strategies)
+        seconds = sum(self.totals[name][1] for name in strategies)
+        return chars / seconds if seconds > 0 else 0.0
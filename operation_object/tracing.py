@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+
+
+class Span:
+    """A timed region of a run; used as a context manager"""
+    __slots__ = ("tracer", "name", "cat", "args", "start", "end", "tid")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = self.end = 0
+        self.tid = threading.get_ident()
+
+    def set(self, **args):
+        """Attach extra values, e.g. how long a sleep actually took"""
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter_ns()
+        if exc is not None:
+            self.args["error"] = str(exc)
+        self.tracer.spans.append(self)
+        return False
+
+
+class _NullSpan:
+    """Shared do-nothing span returned while tracing is disabled"""
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """Tracer used when tracing is off; every call is a constant-time no-op"""
+    enabled = False
+
+    def span(self, name, cat="action", **args):
+        return _NULL_SPAN
+
+    def write(self, path):
+        return None
+
+
+class Tracer:
+    """Collects spans for every stage and action and exports them as JSONL or Chrome trace events"""
+    enabled = True
+
+    def __init__(self):
+        self.spans = []
+        self.pid = os.getpid()
+        self.origin = time.perf_counter_ns()
+
+    def span(self, name, cat="action", **args):
+        return Span(self, name, cat, args)
+
+    def _events(self):
+        for span in sorted(self.spans, key=lambda s: s.start):
+            yield {
+                "name": span.name,
+                "cat": span.cat,
+                "ts_us": (span.start - self.origin) / 1000,
+                "dur_us": (span.end - span.start) / 1000,
+                "pid": self.pid,
+                "tid": span.tid,
+                "args": span.args,
+            }
+
+    def write_jsonl(self, path):
+        """One span per line, timestamps in microseconds since the tracer started"""
+        with open(path, "w") as f:
+            for event in self._events():
+                f.write(json.dumps(event, default=str) + "\n")
+
+    def write_chrome(self, path):
+        """Chrome trace_event format, viewable in chrome://tracing or Perfetto"""
+        events = [
+            {
+                "name": event["name"],
+                "cat": event["cat"],
+                "ph": "X",
+                "ts": event["ts_us"],
+                "dur": event["dur_us"],
+                "pid": event["pid"],
+                "tid": event["tid"],
+                "args": event["args"],
+            }
+            for event in self._events()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def write(self, path):
+        """Write <path>.jsonl and <path>.trace.json and return both file names"""
+        jsonl_path = f"{path}.jsonl"
+        chrome_path = f"{path}.trace.json"
+        self.write_jsonl(jsonl_path)
+        self.write_chrome(chrome_path)
+        return jsonl_path, chrome_path
+
+
+_tracer = NullTracer()
+
+
+def get_tracer():
+    """The process-wide tracer; a NullTracer unless enable_tracing() was called"""
+    return _tracer
+
+
+def enable_tracing():
+    """Start collecting spans for this process and return the tracer"""
+    global _tracer
+    if not _tracer.enabled:
+        _tracer = Tracer()
+    return _tracer
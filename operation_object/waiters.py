@@ -0,0 +1,179 @@
+import os
+from operation_object.clock import SYSTEM_CLOCK
+
+
+def grab_region(region=None):
+    """Capture a screen region given as (left, top, width, height), or the full screen"""
+    from PIL import ImageGrab
+
+    if region is None:
+        return ImageGrab.grab()
+    left, top, width, height = region
+    return ImageGrab.grab(bbox=(left, top, left + width, top + height))
+
+
+def mean_difference(first, second):
+    """Mean absolute grayscale difference between two images (0-255)"""
+    from PIL import ImageChops, ImageStat
+
+    first = first.convert("L")
+    second = second.convert("L")
+    # Screenshots on scaled displays may not match the reference size exactly
+    if first.size != second.size:
+        second = second.resize(first.size)
+    return ImageStat.Stat(ImageChops.difference(first, second)).mean[0]
+
+
+class Condition:
+    """A screen condition polled by wait_until"""
+
+    def arm(self, grab):
+        """Capture any baseline needed before the triggering action"""
+
+    def satisfied(self, grab) -> bool:
+        raise NotImplementedError
+
+
+class RegionChanged(Condition):
+    """Satisfied once the region differs from its baseline capture"""
+
+    def __init__(self, region, tolerance: float = 1.0):
+        self.region = tuple(region)
+        self.tolerance = tolerance
+        self.baseline = None
+
+    def arm(self, grab):
+        # Copy, since a shared capture service may reuse the frame's memory
+        self.baseline = grab(self.region).copy()
+
+    def satisfied(self, grab):
+        if self.baseline is None:
+            self.arm(grab)
+            return False
+        return mean_difference(self.baseline, grab(self.region)) > self.tolerance
+
+
+class RegionMatches(Condition):
+    """Satisfied once the region matches reference pixels"""
+
+    def __init__(self, region, reference, tolerance: float = 8.0):
+        from PIL import Image
+
+        self.region = tuple(region)
+        self.reference = Image.open(reference) if isinstance(reference, str) else reference
+        self.tolerance = tolerance
+
+    def satisfied(self, grab):
+        return mean_difference(self.reference, grab(self.region)) <= self.tolerance
+
+
+class ScreenSettled(Condition):
+    """Satisfied once two consecutive captures differ by less than tolerance
+
+    With changed=True the screen must first differ from the armed capture, so
+    a UI that has not started reacting yet does not count as settled.
+    """
+
+    def __init__(self, region=None, tolerance: float = 0.5, changed: bool = False):
+        self.region = region
+        self.tolerance = tolerance
+        self.require_change = changed
+        self.previous = None
+        self.baseline = None
+        self.changed = not changed
+
+    def arm(self, grab):
+        self.previous = self.baseline = grab(self.region).copy()
+        self.changed = not self.require_change
+
+    def satisfied(self, grab):
+        current = grab(self.region).copy()
+        previous, self.previous = self.previous, current
+        if not self.changed:
+            self.changed = self.baseline is not None and mean_difference(self.baseline, current) >= self.tolerance
+            return False
+        return previous is not None and mean_difference(previous, current) < self.tolerance
+
+
+class TemplateVisible(Condition):
+    """Satisfied once a template image is found inside the region (or the full screen)"""
+
+    def __init__(self, template, region=None, grayscale: bool = True):
+        from PIL import Image
+
+        self.template = Image.open(template) if isinstance(template, str) else template
+        self.region = tuple(region) if region is not None else None
+        self.grayscale = grayscale
+
+    def satisfied(self, grab):
+        import pyscreeze
+
+        try:
+            found = pyscreeze.locate(self.template, grab(self.region), grayscale=self.grayscale)
+        except pyscreeze.ImageNotFoundException:
+            found = None
+        return found is not None
+
+
+def wait_until(condition, timeout: float = 10.0, interval: float = 0.1, grab=grab_region, clock=SYSTEM_CLOCK):
+    """Poll condition until satisfied; return the elapsed seconds, or None on timeout"""
+    start = clock.now()
+    deadline = start + timeout
+    while True:
+        if condition.satisfied(grab):
+            return clock.now() - start
+        now = clock.now()
+        if now >= deadline:
+            return None
+        clock.sleep(min(interval, deadline - now))
+
+
+class Wait:
+    """A configured condition together with its polling rate and timeout"""
+
+    def __init__(self, name, condition, timeout: float, interval: float, grab=grab_region, clock=SYSTEM_CLOCK):
+        self.name = name
+        self.condition = condition
+        self.timeout = timeout
+        self.interval = interval
+        self.grab = grab
+        self.clock = clock
+
+    def arm(self):
+        """Capture the baseline; call before the action that should change the screen"""
+        self.condition.arm(self.grab)
+
+    def wait(self):
+        """Block until the condition holds and return the elapsed seconds"""
+        elapsed = wait_until(self.condition, self.timeout, self.interval, self.grab, self.clock)
+        if elapsed is None:
+            raise TimeoutError(f"Timed out after {self.timeout}s waiting for '{self.name}'")
+        return elapsed
+
+
+CONDITIONS = {
+    "region_changed": lambda spec, base_dir: RegionChanged(
+        spec["region"], spec.get("tolerance", 1.0)),
+    "region_matches": lambda spec, base_dir: RegionMatches(
+        spec["region"], os.path.join(base_dir, spec["reference"]), spec.get("tolerance", 8.0)),
+    "template_visible": lambda spec, base_dir: TemplateVisible(
+        os.path.join(base_dir, spec["template"]), spec.get("region"), spec.get("grayscale", True)),
+}
+
+
+def load_waits(waits_config, base_dir, grab=grab_region, clock=SYSTEM_CLOCK):
+    """Build Wait objects from a [waits.*] config section; image paths are relative to base_dir"""
+    waits = {}
+    for name, spec in (waits_config or {}).items():
+        kind = spec.get("condition")
+        if kind not in CONDITIONS:
+            raise ValueError(f"Unknown condition '{kind}' for wait '{name}'")
+        waits[name] = Wait(
+            name,
+            CONDITIONS[kind](spec, base_dir),
+            timeout=spec.get("timeout", 10.0),
+            interval=spec.get("interval", 0.1),
+            grab=grab,
+            clock=clock,
+        )
+    return waits
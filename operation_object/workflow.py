@@ -0,0 +1,559 @@
+import os
+from collections import namedtuple
+from itertools import groupby
+from operation_object.waiters import ScreenSettled, grab_region, load_waits, wait_until
+from operation_object.delay_profile import DelayProfile
+from operation_object.tracing import get_tracer
+from operation_object.clock import SYSTEM_CLOCK
+from operation_object.checkpoint import Checkpoint
+from operation_object.retry import RunResult, backoff_delay, parse_policy
+from operation_object.anchors import AnchorLocator
+from operation_object.screen_capture import CaptureService
+from operation_object.input_hooks import Aborted, get_hooks
+from operation_object.text_injection import TextInjector
+from operation_object.launcher import load_launchers
+
+# One precomputed step of a compiled workflow plan
+Action = namedtuple("Action", ["stage", "name", "kind", "x", "y", "text", "seconds", "wait", "delay", "message",
+                               "retry", "anchor", "app", "task", "verify", "verify_timeout"])
+
+STEP_ACTIONS = ("click", "double_click", "type", "wait", "launch", "call")
+
+# Stages of this kind are interactive and run outside the execution plan
+CALIBRATION_KIND = "calibration"
+
+
+class WorkflowEngine:
+    """Compile the [workflow] and [stage.*] sections of metadata.toml into a flat action plan
+
+    Every stage lists its steps as [[stage.<name>.steps]] tables:
+
+        action = "click" | "double_click" | "type" | "wait" | "launch" | "call"
+        position = "<positions key>"     # click / double_click; launch: icon for apps without a command
+        text = "..."                     # type
+        app = "<apps key>"               # launch: start or reuse the app and wait for its window
+        task = "<task name>"             # call: a Python task the procedure registered with the engine
+        seconds = 30                     # wait: fixed sleep, or timeout fallback for `until`
+        until = "<waits key>"            # wait: screen condition replacing the sleep
+        delay = 0.5                      # optional override of the delay after the step
+        verify = "<waits key>"           # optional postcondition checked right after a click or type
+        verify_timeout = 1.0             # optional; defaults to [configuration] verify_timeout
+        name = "..."                     # optional step name for waits and delay profiles
+        message = "..."                  # optional progress message
+
+    A stage or a single step may declare a retry policy, as [stage.<name>.retry]
+    or [stage.<name>.steps.retry]: attempts, backoff (seconds), multiplier,
+    max_backoff and optional [[...retry.recovery]] steps that bring the UI back
+    to a known screen before the next attempt.
+
+    A verify postcondition is polled with small-region captures as soon as the
+    input is sent, before the step's delay; if it does not hold within
+    verify_timeout the stage fails at once, naming the step, instead of the
+    following steps running against the wrong screen. Like `until`, a verify
+    naming a wait that is not configured is skipped, with a warning from compile().
+    The shipped configs define no [waits.*] regions, so they set no verify
+    keys; once e.g. [waits.interest_areas_shown] is captured for a setup, add
+    verify = "interest_areas_shown" to the click that opens that panel.
+
+    A position may name a template image (template = "anchors/<name>.png") to be
+    located on screen at run time instead of clicked at fixed coordinates; its
+    stored x/y only seed the first search region. A template is assumed to be
+    cut from a screenshot of the screen it is searched on; template_scale = 2
+    marks one cut on a Retina screen, so it is resized for other densities.
+
+    All requirements are validated by compile() before anything executes.
+    """
+
+    def __init__(self, config, base_dir, backend, tracer=None, clock=SYSTEM_CLOCK, tasks=None):
+        self.config = config
+        self.base_dir = base_dir
+        # Non-UI work that call steps run by name, e.g. processing an exported file
+        self.tasks = dict(tasks or {})
+        self.backend = backend
+        # Text is typed or pasted depending on its length
+        self.injector = TextInjector.from_config(backend, config["configuration"])
+        self.delay = config["configuration"]["default_delay"]
+        self.tracer = tracer or get_tracer()
+        self.clock = clock
+
+        # Shared capture of the wait regions, if capture_rate is configured
+        self.capture = CaptureService.from_config(config["configuration"])
+        self.grab = self.capture.grab if self.capture is not None else grab_region
+
+        # Optional screen conditions that replace fixed sleeps, keyed by step or wait name
+        self.waits = load_waits(config.get("waits"), base_dir, grab=self.grab, clock=clock)
+        if self.capture is not None:
+            for wait in self.waits.values():
+                if getattr(wait.condition, "region", None) is not None:
+                    self.capture.register(wait.condition.region)
+
+        # Per-step delays learned from previous runs, if enabled; steps without a wait are
+        # measured by screen settling (polled every settle_interval) until they have enough samples
+        self.delay_profile = None
+        self.measure_settling = True
+        self.settle_interval = 0.1
+        if config["configuration"].get("adaptive_delay", False):
+            self.delay_profile = DelayProfile.from_config(
+                os.path.join(base_dir, "delay_profile.json"), config["configuration"])
+
+        # Completed stages of the current run, so a failed run can resume (None disables)
+        self.checkpoint = Checkpoint(os.path.join(base_dir, "checkpoint.json"))
+
+        # Applications started by launch steps, from the [apps.*] sections
+        self.launchers = load_launchers(config.get("apps"), clock)
+
+        # Template-anchored positions, loaded by compile() once their images are validated
+        self.anchors = None
+
+        # Stage retry policies (filled by compile) and the outcome of the last run
+        self.stage_policies = {}
+        self.last_result = None
+
+        # Optional on_progress(event: dict) callback, e.g. to stream stage progress to a daemon client
+        self.on_progress = None
+
+    def stage_names(self):
+        """Names of the stages that make up the execution plan, in workflow order"""
+        stages = self.config.get("stage", {})
+        return [
+            name for name in self.config["workflow"]["stages"]
+            if stages.get(name, {}).get("kind") != CALIBRATION_KIND
+        ]
+
+    def _check_requirement(self, stage_name, requirement, errors):
+        positions = self.config.get("positions", {})
+        if requirement in positions:
+            pos = positions[requirement]
+            if "template" in pos:
+                if not os.path.exists(os.path.join(self.base_dir, pos["template"])):
+                    errors.append(f"{stage_name}: template '{pos['template']}' for position '{requirement}' not found")
+                scale = pos.get("template_scale", 1)
+                if not isinstance(scale, (int, float)) or scale <= 0:
+                    errors.append(f"{stage_name}: template_scale of position '{requirement}' must be positive")
+            elif pos.get("x", -1) == -1 or pos.get("y", -1) == -1:
+                errors.append(f"{stage_name}: position '{requirement}' not set. Please calibrate positions first.")
+        elif requirement not in self.config["configuration"]:
+            errors.append(f"{stage_name}: unknown requirement '{requirement}'")
+
+    def _compile_step(self, stage_name, index, step, errors):
+        kind = step.get("action")
+        label = f"{stage_name} step {index + 1}"
+        if kind not in STEP_ACTIONS:
+            errors.append(f"{label}: unknown action '{kind}'")
+            return None
+
+        x = y = text = seconds = wait = anchor = app = task = verify = verify_timeout = None
+        name = step.get("name")
+        if kind == "call":
+            task = step.get("task")
+            if task not in self.tasks:
+                errors.append(f"{label}: unknown task '{task}'")
+                return None
+            name = name or task
+        elif kind == "launch":
+            app = step.get("app")
+            if app not in self.launchers:
+                errors.append(f"{label}: unknown app '{app}'")
+                return None
+            position = step.get("position")
+            if position is not None:
+                if position not in self.config.get("positions", {}):
+                    errors.append(f"{label}: unknown position '{position}'")
+                    return None
+                self._check_requirement(stage_name, position, errors)
+                x = self.config["positions"][position].get("x", -1)
+                y = self.config["positions"][position].get("y", -1)
+            elif not self.launchers[app].command:
+                errors.append(f"{label}: app '{app}' has no command, so the step needs a position to launch it")
+            # Without a window title the app's readiness falls back to the wait or sleep
+            wait = step.get("until") if step.get("until") in self.waits else None
+            seconds = step.get("seconds", self.delay)
+            name = name or app
+        elif kind in ("click", "double_click"):
+            position = step.get("position")
+            if position not in self.config.get("positions", {}):
+                errors.append(f"{label}: unknown position '{position}'")
+                return None
+            self._check_requirement(stage_name, position, errors)
+            x = self.config["positions"][position].get("x", -1)
+            y = self.config["positions"][position].get("y", -1)
+            if "template" in self.config["positions"][position]:
+                anchor = position
+            name = name or position
+        elif kind == "type":
+            text = step.get("text")
+            if not isinstance(text, str):
+                errors.append(f"{label}: 'type' needs a text value")
+                return None
+            name = name or f"{stage_name}.type"
+        else:
+            wait = step.get("until")
+            if wait is not None and wait not in self.waits:
+                # A missing condition falls back to the fixed sleep
+                wait = None
+            seconds = step.get("seconds", self.delay)
+            name = name or step.get("until") or f"{stage_name}.wait"
+
+        if kind in ("click", "double_click", "type") and step.get("verify") is not None:
+            if step["verify"] not in self.waits:
+                # Skipped like `until`, but a typo must not switch the check off unnoticed
+                print(f"Warning: {label} verifies '{step['verify']}', which is not a configured wait; "
+                      f"the step is not checked")
+            else:
+                verify = step["verify"]
+                verify_timeout = step.get("verify_timeout",
+                                          self.config["configuration"].get("verify_timeout", 1.0))
+                if not isinstance(verify_timeout, (int, float)) or verify_timeout <= 0:
+                    errors.append(f"{label}: verify_timeout must be positive")
+
+        retry = None
+        if "retry" in step:
+            retry = self._compile_policy(stage_name, f"{label} retry", step["retry"], errors)
+
+        return Action(stage_name, name, kind, x, y, text, seconds, wait,
+                      step.get("delay"), step.get("message"), retry, anchor, app, task, verify, verify_timeout)
+
+    def _compile_policy(self, stage_name, label, spec, errors):
+        policy = parse_policy(spec, label, errors)
+        for index, step in enumerate(spec.get("recovery", [])):
+            if "retry" in step:
+                errors.append(f"{label} recovery step {index + 1}: recovery steps cannot retry")
+                continue
+            action = self._compile_step(stage_name, index, step, errors)
+            if action is not None:
+                policy.recovery.append(action)
+        return policy
+
+    def _compile_stage(self, stage_name, errors, policies):
+        stage = self.config.get("stage", {}).get(stage_name)
+        if stage is None:
+            errors.append(f"{stage_name}: no [stage.{stage_name}] section")
+            return []
+        if "retry" in stage:
+            policies[stage_name] = self._compile_policy(stage_name, f"{stage_name} retry", stage["retry"], errors)
+        for requirement in stage.get("requirements", []):
+            self._check_requirement(stage_name, requirement, errors)
+        steps = stage.get("steps", [])
+        if not steps:
+            errors.append(f"{stage_name}: no steps defined")
+        actions = []
+        for index, step in enumerate(steps):
+            action = self._compile_step(stage_name, index, step, errors)
+            if action is not None:
+                actions.append(action)
+        return actions
+
+    def _finish_compile(self, errors):
+        if errors:
+            raise ValueError("Workflow validation failed:\n  " + "\n  ".join(errors))
+        if self.anchors is None and any("template" in pos for pos in self.config.get("positions", {}).values()):
+            self.anchors = AnchorLocator(self.config["positions"], self.base_dir, grab=self.grab)
+
+    def compile(self):
+        """Validate every stage and return the flat list of Actions; raise ValueError listing all problems"""
+        errors = []
+        plan = []
+        policies = {}
+        for stage_name in self.stage_names():
+            plan.extend(self._compile_stage(stage_name, errors, policies))
+
+        self._finish_compile(errors)
+        self.stage_policies = policies
+        return plan
+
+    def compile_stage(self, stage_name):
+        """Validate a single stage, e.g. a per-record template outside the workflow, and return its Actions"""
+        errors = []
+        policies = {}
+        actions = self._compile_stage(stage_name, errors, policies)
+        self._finish_compile(errors)
+        self.stage_policies.update(policies)
+        return actions
+
+    def step_delay(self, step: str):
+        """Delay after a step: learned from run history if enabled, otherwise the default"""
+        if self.delay_profile is None:
+            return self.delay
+        return self.delay_profile.delay_for(step)
+
+    def sleep(self, seconds: float, name: str):
+        """Fixed sleep, traced with the requested and the actually slept time"""
+        with self.tracer.span(name, "sleep", requested=seconds) as span:
+            start = self.clock.now()
+            self.clock.sleep(seconds)
+            span.set(actual=self.clock.now() - start)
+
+    def wait_for(self, name: str, fallback: float):
+        """Wait for the named screen condition, or sleep fallback seconds if none is configured"""
+        wait = self.waits.get(name)
+        if wait is None:
+            self.sleep(fallback, name)
+            return fallback
+
+        with self.tracer.span(name, "wait", timeout=wait.timeout) as span:
+            elapsed = wait.wait()
+            span.set(elapsed=elapsed)
+        if self.delay_profile is not None:
+            self.delay_profile.record_ready(name, elapsed)
+        return elapsed
+
+    def perform(self, action):
+        """Execute a single compiled action and wait until the UI is ready for the next one"""
+        if action.message:
+            print(action.message)
+
+        with self.tracer.span(action.name, "action", kind=action.kind, x=action.x, y=action.y):
+            if action.kind == "wait":
+                self.wait_for(action.wait or action.name, action.seconds)
+                return
+            if action.kind == "launch":
+                self.launch(action)
+                return
+            if action.kind == "call":
+                with self.tracer.span(action.task, "task"):
+                    self.tasks[action.task]()
+                return
+
+            # Baselines must be captured before the action changes the screen
+            wait = self.waits.get(action.name)
+            if wait is not None:
+                wait.arm()
+            if action.verify is not None:
+                self.waits[action.verify].arm()
+            settle = self._settle_condition(action) if wait is None else None
+
+            x, y = action.x, action.y
+            if action.anchor is not None:
+                with self.tracer.span(action.anchor, "locate") as span:
+                    x, y = self.anchors.locate(action.anchor)
+                    span.set(x=x, y=y, **self.anchors.stats)
+
+            with self.tracer.span(action.kind, "input") as span:
+                if action.kind == "click":
+                    self.backend.click(x, y)
+                elif action.kind == "double_click":
+                    self.backend.double_click(x, y)
+                else:
+                    injection = self.injector.inject(action.text)
+                    span.set(strategy=injection.strategy, chars=injection.chars)
+
+            if action.verify is not None:
+                self.verify(action)
+            delay = action.delay if action.delay is not None else self.step_delay(action.name)
+            if settle is not None:
+                self.measure_settle(action.name, settle, delay)
+            else:
+                self.wait_for(action.name, delay)
+
+    def _settle_condition(self, action):
+        """An armed ScreenSettled for a step whose delay is still being learned, or None"""
+        if (self.delay_profile is None or not self.measure_settling or action.delay is not None
+                or self.delay_profile.measured(action.name)):
+            return None
+        condition = ScreenSettled(changed=True)
+        try:
+            condition.arm(self.grab)
+        except Exception:
+            return None  # No screen to capture; the step keeps its fixed delay
+        return condition
+
+    def measure_settle(self, name: str, condition, delay: float):
+        """Spend at most delay seconds waiting for the screen to react and settle, recording how long it took
+
+        A screen that does not settle in time is recorded at the full delay, so
+        the step's learned delay never drops below what it needed.
+        """
+        start = self.clock.now()
+        with self.tracer.span(name, "settle", timeout=delay) as span:
+            try:
+                elapsed = wait_until(condition, delay, self.settle_interval, self.grab, self.clock)
+            except Exception:
+                self.sleep(max(0.0, delay - (self.clock.now() - start)), name)
+                return
+            span.set(elapsed=elapsed)
+        self.delay_profile.record_ready(name, delay if elapsed is None else elapsed)
+
+    def verify(self, action):
+        """Check a step's postcondition right after its input; raise RuntimeError naming the step if it fails"""
+        check = self.waits[action.verify]
+        with self.tracer.span(action.verify, "verify", timeout=action.verify_timeout) as span:
+            elapsed = wait_until(check.condition, action.verify_timeout, check.interval, self.grab, self.clock)
+            span.set(elapsed=elapsed)
+        if elapsed is None:
+            raise RuntimeError(f"Step '{action.name}' of {action.stage} had no effect: "
+                               f"'{action.verify}' did not hold within {action.verify_timeout}s")
+
+    def launch(self, action):
+        """Start or reuse an app and wait until it is ready"""
+        launcher = self.launchers[action.app]
+        launcher.clock = self.clock
+        fallback = None
+        if action.x is not None:
+            fallback = lambda: self.backend.double_click(action.x, action.y)
+
+        if not launcher.detects_readiness:
+            wait = self.waits.get(action.wait or action.name)
+            if wait is not None:
+                wait.arm()
+            with self.tracer.span(action.app, "launch", ready="wait"):
+                launcher.start(fallback)
+            self.wait_for(action.wait or action.name, action.seconds)
+        else:
+            with self.tracer.span(action.app, "launch", ready="window") as span:
+                elapsed = launcher.ensure_running(fallback)
+                span.set(elapsed=elapsed)
+        # Extra settling time after the app is ready, on either path
+        if action.delay:
+            self.sleep(action.delay, action.name)
+
+    def notify(self, event, **fields):
+        """Report progress to on_progress, if set; callback errors never stop the run"""
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(dict(event=event, **fields))
+        except Exception as e:
+            print(f"Progress callback failed: {str(e)}")
+
+    def resume_point(self, plan):
+        """Stages at the start of the plan that the last checkpoint recorded as completed"""
+        if self.checkpoint is None:
+            return []
+        completed = self.checkpoint.completed_stages(self.config)
+        skipped = []
+        for stage_name, _ in groupby(plan, key=lambda action: action.stage):
+            if stage_name not in completed:
+                break
+            skipped.append(stage_name)
+        return skipped
+
+    def run(self, plan=None, resume: bool = False):
+        """Run a compiled plan (compiling one if needed); return True if every stage succeeded
+
+        With resume, stages completed by the previous run are skipped, provided
+        the configuration has not changed since that run's checkpoint.
+        """
+        plan = self.compile() if plan is None else plan
+        skipped = self.resume_point(plan) if resume else []
+        if skipped:
+            print(f"Resuming after completed stages: {', '.join(skipped)}")
+            plan = [action for action in plan if action.stage not in skipped]
+        if self.checkpoint is not None:
+            self.checkpoint.start(self.config, skipped)
+
+        # The abort and pause hotkeys of the shared input hooks take effect between actions;
+        # presses from before the run (e.g. F9 while idle) must not stop or stall it
+        hooks = get_hooks()
+        hooks.aborted.clear()
+        hooks.paused.clear()
+
+        stages = self.config.get("stage", {})
+        stage_order = list(dict.fromkeys(action.stage for action in plan))
+        result = self.last_result = RunResult()
+        current_stage = None
+        stage_steps = []
+        run_steps = []
+        if self.capture is not None:
+            self.capture.start()
+        try:
+            with self.tracer.span("workflow", "run", actions=len(plan)) as run_span:
+                for stage_name, actions in groupby(plan, key=lambda action: action.stage):
+                    actions = list(actions)
+                    if current_stage is not None:
+                        self.sleep(self.delay, "between_stages")
+                    current_stage = stage_name
+                    print(f"\nExecuting {current_stage} stage...")
+                    self.notify("stage", stage=stage_name, index=stage_order.index(stage_name) + 1,
+                                total=len(stage_order), skipped=len(skipped))
+
+                    def run_stage():
+                        stage_steps.clear()
+                        with self.tracer.span(stage_name, "stage", attempt=result.attempts.get(stage_name)):
+                            for action in actions:
+                                while hooks.paused.is_set() and not hooks.aborted.is_set():
+                                    self.clock.sleep(0.05)
+                                if hooks.aborted.is_set():
+                                    raise Aborted(f"Aborted by hotkey before {action.name}")
+                                if action.retry is None:
+                                    self.perform(action)
+                                else:
+                                    self.attempt(f"{stage_name}.{action.name}", action.retry,
+                                                 lambda: self.perform(action), result)
+                                if action.kind != "wait":
+                                    stage_steps.append(action.name)
+
+                    self.attempt(stage_name, self.stage_policies.get(stage_name), run_stage, result,
+                                 on_failure=lambda: self._record_failure(stage_steps))
+                    run_steps.extend(stage_steps)
+                    self._finish_stage(stages.get(current_stage, {}))
+                    if self.checkpoint is not None:
+                        self.checkpoint.mark(stage_name)
+                    self.notify("stage_completed", stage=stage_name)
+                if self.capture is not None:
+                    run_span.set(capture=self.capture.stats())
+        except Aborted as e:
+            # Not a timing problem, so the delay profile is left alone
+            result.failed_stage = current_stage
+            result.cancelled = True
+            result.error = str(e)
+            self.notify("cancelled", stage=current_stage)
+            raise
+        except Exception as e:
+            print(f"Error during {current_stage} stage: {str(e)}")
+            print(f"Workflow failed at {current_stage}")
+            result.failed_stage = current_stage
+            result.error = str(e)
+            self._record_failure(stage_steps)
+            self.notify("failed", stage=current_stage, error=str(e))
+            return False
+        finally:
+            if self.capture is not None:
+                self.capture.stop()
+            if result.retries:
+                print(result.report())
+
+        result.success = True
+        if self.delay_profile is not None:
+            self.delay_profile.record_success(run_steps)
+            self.delay_profile.save()
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        return True
+
+    def attempt(self, key, policy, operation, result, on_failure=None):
+        """Run operation under a retry policy, counting every attempt in result"""
+        attempts = policy.attempts if policy is not None else 1
+        for attempt in range(1, attempts + 1):
+            result.count(key)
+            try:
+                return operation()
+            except Exception as e:
+                if attempt == attempts:
+                    raise
+                if on_failure is not None:
+                    on_failure()
+                delay = backoff_delay(policy, attempt)
+                print(f"{key} failed: {str(e)}. Retrying in {delay:.1f}s (attempt {attempt + 1}/{attempts})...")
+                self.notify("retry", key=key, attempt=attempt + 1, attempts=attempts, error=str(e))
+                if policy.recovery:
+                    result.recoveries += 1
+                self.recover(policy)
+                self.sleep(delay, f"{key}.backoff")
+
+    def recover(self, policy):
+        """Run a policy's recovery steps; their failures are reported but do not stop the retry"""
+        for action in policy.recovery:
+            try:
+                self.perform(action)
+            except Exception as e:
+                print(f"Recovery step {action.name} failed: {str(e)}")
+
+    def _record_failure(self, steps):
+        if self.delay_profile is not None and steps:
+            # Assume the failing steps were not given enough time
+            self.delay_profile.record_failure(steps)
+            self.delay_profile.save()
+
+    def _finish_stage(self, stage):
+        if stage.get("completed"):
+            print(stage["completed"])
@@ -0,0 +1,65 @@
+import os
+from operation_object.input_backend import create_backend, DEFAULT_BACKEND
+from operation_object.config_store import ConfigStore
+from operation_object.workflow import WorkflowEngine
+from operation_object.async_runner import run_plan
+from operation_object.layout import adapt_to_screen
+
+# [configuration] values a metadata.toml-only procedure may leave out
+DEFAULT_CONFIGURATION = {"default_delay": 1.0}
+
+
+class WorkflowProcedure:
+    """Operation object for a procedure defined by its metadata.toml alone
+
+    The registry uses it for procedure directories whose [procedure] table
+    names no module and class, so a [workflow] list and its [stage.*] tables
+    (e.g. from --to-steps) are enough to run a new workflow.
+    """
+
+    # Procedure directory; set on the classes made by for_directory()
+    base_dir = None
+
+    @classmethod
+    def for_directory(cls, base_dir, name=None):
+        """Operation object class bound to one procedure directory"""
+        return type(name or cls.__name__, (cls,), {"base_dir": base_dir})
+
+    def __init__(self, backend=None):
+        """Load the procedure's metadata.toml and build its workflow engine"""
+        try:
+            self.store = ConfigStore(os.path.join(self.base_dir, "metadata.toml"))
+            self.config = self.store.load()
+            configuration = self.config.setdefault("configuration", {})
+            for key, value in DEFAULT_CONFIGURATION.items():
+                configuration.setdefault(key, value)
+            self.delay = configuration["default_delay"]
+
+            # Input backend: explicit argument, then $INPUT_BACKEND, then metadata.toml
+            self.backend = create_backend(backend, configuration.get("input_backend", DEFAULT_BACKEND))
+            self.engine = WorkflowEngine(self.config, self.base_dir, self.backend)
+        except Exception as e:
+            print(f"Error loading configuration: {str(e)}")
+            raise
+
+    def adapt_layout(self):
+        """Rescale all positions in memory if the screen geometry changed since they were captured"""
+        if self.backend.name == "null":
+            return True  # Nothing is clicked on a real screen
+        try:
+            adapt_to_screen(self.config)
+            return True
+        except Exception as e:
+            print(f"Error checking screen layout: {str(e)}")
+            return False
+
+    def execute(self, resume: bool = False):
+        """Execute the workflow, optionally resuming after the last completed stage"""
+        try:
+            # Follow screen geometry changes, then validate every stage before the first action
+            self.adapt_layout()
+            plan = self.engine.compile()
+            return run_plan(self.engine, plan, resume=resume)
+        except Exception as e:
+            print(f"Error during execution: {str(e)}")
+            return False
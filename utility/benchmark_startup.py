@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Text printed by get_procedure_choice right before it blocks on input()
+MENU_PROMPT = b"Enter your choice"
+
+
+def bundle_size(path):
+    """Size in bytes of a one-file binary or a one-dir bundle"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            total += os.path.getsize(os.path.join(dirpath, filename))
+    return total
+
+
+def time_to_menu(command, timeout=60.0):
+    """Seconds from process spawn until the first menu prompt is printed; the process is killed after timeout"""
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    state = {"output": b"", "prompted": None}
+    done = threading.Event()
+
+    def read():
+        # The prompt has no trailing newline, so read raw chunks rather than lines
+        while True:
+            chunk = os.read(process.stdout.fileno(), 4096)
+            if not chunk:
+                break
+            state["output"] += chunk
+            if MENU_PROMPT in state["output"]:
+                state["prompted"] = time.perf_counter()
+                break
+        done.set()
+
+    # A reader thread rather than selectors, which cannot wait on pipes on Windows
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    try:
+        if not done.wait(timeout):
+            raise TimeoutError(f"No menu prompt after {timeout}s")
+        if state["prompted"] is None:
+            raise RuntimeError(f"Process exited before the menu prompt: {state['output'][-200:]!r}")
+        return state["prompted"] - start
+    finally:
+        process.kill()
+        process.wait()
+        reader.join(timeout=5.0)
+
+
+def import_times(modules, top=15):
+    """Per-module import time (cumulative microseconds) from python -X importtime"""
+    statement = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    rows.sort(key=lambda row: row["cumulative_us"], reverse=True)
+    return rows[:top]
+
+
+def run_benchmark(binary=None, runs=5):
+    """Collect bundle size, cold-start and import-time figures into one report"""
+    command = [binary] if binary else [sys.executable, os.path.join(ROOT_DIR, "main.py")]
+    samples = [time_to_menu(command) for _ in range(runs)]
+
+    from operation_object.registry import discover
+    procedures = {procedure.key: procedure.module for procedure in discover()}
+
+    report = {
+        "command": command,
+        "startup_s": {
+            "first": round(samples[0], 4),
+            "min": round(min(samples), 4),
+            "median": round(statistics.median(samples), 4),
+        },
+        # Startup path only imports main; procedures are imported when selected
+        "imports": {"main": import_times(["main"])},
+    }
+    for key, module in procedures.items():
+        try:
+            report["imports"][key] = import_times([module])
+        except subprocess.CalledProcessError as e:
+            report["imports"][key] = {"error": e.stderr.strip().splitlines()[-1]}
+    if binary:
+        report["bundle_bytes"] = bundle_size(binary)
+    return report
+
+
+def check_limits(report, max_startup=None, max_size_mb=None):
+    """Return a list of budget violations"""
+    failures = []
+    if max_startup is not None and report["startup_s"]["median"] > max_startup:
+        failures.append(f"median startup {report['startup_s']['median']}s exceeds {max_startup}s")
+    if max_size_mb is not None and "bundle_bytes" in report:
+        size_mb = report["bundle_bytes"] / (1024 * 1024)
+        if size_mb > max_size_mb:
+            failures.append(f"bundle size {size_mb:.1f} MB exceeds {max_size_mb} MB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start, imports and bundle size")
+    parser.add_argument("--binary", help="built executable or one-dir bundle (default: run main.py)")
+    parser.add_argument("--runs", type=int, default=5, help="number of startup samples")
+    parser.add_argument("--max-startup", type=float, help="fail if median startup exceeds this many seconds")
+    parser.add_argument("--max-size-mb", type=float, help="fail if the bundle exceeds this many MB")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT_DIR)
+    binary = os.path.abspath(args.binary) if args.binary else None
+    report = run_benchmark(binary, args.runs)
+    report["failures"] = check_limits(report, args.max_startup, args.max_size_mb)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
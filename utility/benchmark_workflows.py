@@ -0,0 +1,169 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from operation_object.clock import VirtualClock
+from operation_object.input_backend import NullBackend
+from operation_object.registry import discover
+
+BASELINE_FILE = os.path.join(ROOT_DIR, "utility", "benchmark_baseline.json")
+
+
+class SimulatedBackend(NullBackend):
+    """Records actions and charges a fixed injection latency to the virtual clock"""
+
+    def __init__(self, clock, latency: float = 0.0):
+        super().__init__()
+        self.clock = clock
+        self.latency = latency
+
+    def click(self, x, y):
+        super().click(x, y)
+        self.clock.advance(self.latency)
+
+    def double_click(self, x, y):
+        super().double_click(x, y)
+        self.clock.advance(self.latency)
+
+    def write(self, text: str, interval: float = 0.0):
+        super().write(text, interval)
+        self.clock.advance(self.latency + interval * len(text))
+
+    def paste(self, text: str, settle: float = 0.05):
+        super().paste(text, settle)
+        self.clock.advance(self.latency + settle)
+
+
+class SimulatedWait:
+    """Stands in for a screen wait; the condition holds after a fixed fraction of its timeout"""
+
+    def __init__(self, wait, clock, fraction: float):
+        self.name = wait.name
+        self.timeout = wait.timeout
+        self.clock = clock
+        self.fraction = fraction
+
+    def arm(self):
+        pass
+
+    def wait(self):
+        elapsed = self.timeout * self.fraction
+        self.clock.sleep(elapsed)
+        return elapsed
+
+
+def simulate(procedure, latency=0.0, wait_fraction=0.5, with_profile=False):
+    """Run one procedure's workflow against a virtual clock and a simulated backend"""
+    clock = VirtualClock()
+    backend = SimulatedBackend(clock, latency)
+    operation = procedure.load()(backend=backend)
+
+    # Positions are irrelevant to the simulation; fill unset ones so the plan compiles
+    for position in operation.config["positions"].values():
+        position.pop("template", None)  # Never search the real screen for anchors
+        if position.get("x", -1) == -1 or position.get("y", -1) == -1:
+            position.update(x=0, y=0)
+
+    operation.adapt_layout = lambda: True  # There is no real screen whose geometry could change
+    operation.config["configuration"]["async_runner"] = False  # Sleeps must stay on the virtual clock
+    engine = operation.engine
+    engine.clock = clock
+    engine.checkpoint = None  # Simulated runs must not touch the real checkpoint
+    engine.capture = None
+    engine.waits = {name: SimulatedWait(wait, clock, wait_fraction) for name, wait in engine.waits.items()}
+    if with_profile and engine.delay_profile is not None:
+        engine.delay_profile.path = None  # Use learned delays but never write them back
+        engine.measure_settling = False  # Settling would be measured on the real screen
+    else:
+        engine.delay_profile = None
+
+    plan = engine.compile()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        success = operation.execute()
+    wall = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(f"Simulated {procedure.key} workflow failed")
+    return {
+        "projected_s": clock.now(),
+        "slept_s": clock.slept,
+        "actions": len(plan),
+        "inputs": len(backend.actions),
+        "overhead_us_per_action": wall / len(plan) * 1e6,
+    }
+
+
+def run_suite(runs=20, **options):
+    """Simulate every procedure; overhead is the median over runs"""
+    report = {}
+    for procedure in discover():
+        samples = [simulate(procedure, **options) for _ in range(runs)]
+        result = samples[0]
+        result["overhead_us_per_action"] = statistics.median(s["overhead_us_per_action"] for s in samples)
+        report[procedure.key] = {key: round(value, 3) for key, value in result.items()}
+    return report
+
+
+def compare(report, baseline, threshold, overhead_threshold):
+    """Return regressions of report against baseline"""
+    failures = []
+    for key, result in report.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric, limit in [("projected_s", threshold), ("actions", threshold),
+                              ("overhead_us_per_action", overhead_threshold)]:
+            allowed = reference[metric] * (1 + limit)
+            if result[metric] > allowed:
+                failures.append(f"{key}: {metric} {result[metric]} exceeds baseline {reference[metric]} "
+                                f"by more than {limit:.0%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay workflows on a virtual clock and check for regressions")
+    parser.add_argument("--runs", type=int, default=20, help="runs per procedure for the overhead median")
+    parser.add_argument("--input-latency", type=float, default=0.0, help="simulated seconds per input action")
+    parser.add_argument("--wait-fraction", type=float, default=0.5,
+                        help="fraction of each screen wait's timeout before it is satisfied")
+    parser.add_argument("--with-profile", action="store_true", help="use learned delay profiles")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="allowed relative increase of projected time and action count")
+    parser.add_argument("--overhead-threshold", type=float, default=1.0,
+                        help="allowed relative increase of per-action overhead (noisy, so generous)")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    report = run_suite(args.runs, latency=args.input_latency,
+                       wait_fraction=args.wait_fraction, with_profile=args.with_profile)
+    print(json.dumps(report, indent=2))
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failures = compare(report, baseline, args.threshold, args.overhead_threshold)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import ast
+import json
+import os
+import re
+import sys
+import platform
+from datetime import datetime
+from importlib import metadata
+
+from update_requirements import ESSENTIAL_PACKAGES, MACOS_SPECIFIC, write_requirements
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_FILE = os.path.join(ROOT_DIR, "build_profile.json")
+
+# First-party sources whose imports define what the bundle needs
+SOURCE_DIRS = ['operation_object']
+ENTRY_SCRIPT = 'main.py'
+
+# Modules PyInstaller pulls in through optional imports; excluded unless a bundled package needs them
+CANDIDATE_EXCLUDES = {
+    'tkinter',
+    'unittest',
+    'pydoc',
+    'doctest',
+    'lib2to3',
+    'distutils',
+    'setuptools',
+    'pip',
+    'numpy',
+    'cv2',
+    'PyQt5',
+    'PySide2',
+    'IPython',
+    'matplotlib',
+    'pytest',
+}
+
+# Platform label used in the requirements file name
+PLATFORM_NAMES = {
+    'Darwin': 'macos',
+    'Windows': 'windows',
+    'Linux': 'linux',
+}
+
+
+def source_files():
+    """All first-party Python files that end up in the bundle"""
+    yield os.path.join(ROOT_DIR, ENTRY_SCRIPT)
+    for source_dir in SOURCE_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(ROOT_DIR, source_dir)):
+            for filename in filenames:
+                if filename.endswith('.py'):
+                    yield os.path.join(dirpath, filename)
+
+
+def imported_modules():
+    """Top-level names of every module imported by first-party code, including lazy imports"""
+    names = set()
+    for path in source_files():
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.add(node.module.split('.')[0])
+    return names - set(sys.stdlib_module_names) - {'operation_object'}
+
+
+def _marker_applies(requirement):
+    """Evaluate a requirement's environment marker for this platform, ignoring extras"""
+    if ';' not in requirement:
+        return True
+    marker = requirement.split(';', 1)[1]
+    if 'extra ==' in marker:
+        return False
+    try:
+        from packaging.markers import Marker
+    except ImportError:
+        return True  # Without packaging, keep the dependency to be safe
+    return Marker(marker).evaluate()
+
+
+def _normalize(name):
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def _requirement_name(requirement):
+    name = requirement.split(';', 1)[0]
+    for separator in '<>=!~[ (':
+        name = name.split(separator, 1)[0]
+    return name.strip()
+
+
+def required_distributions(modules):
+    """Distributions providing the given modules plus their runtime dependencies"""
+    providers = metadata.packages_distributions()
+    pending = [dist for name in modules for dist in providers.get(name, [])]
+    missing = sorted(name for name in modules if name not in providers)
+
+    selected = {}
+    while pending:
+        name = pending.pop()
+        if _normalize(name) in selected:
+            continue
+        try:
+            dist = metadata.distribution(name)
+        except metadata.PackageNotFoundError:
+            missing.append(name)
+            continue
+        selected[_normalize(name)] = f"{dist.metadata['Name']}=={dist.version}"
+        for requirement in dist.requires or []:
+            if _marker_applies(requirement):
+                pending.append(_requirement_name(requirement))
+    return selected, missing
+
+
+def top_level_modules(distributions):
+    """Top-level import names provided by the selected distributions"""
+    names = set()
+    for module, dists in metadata.packages_distributions().items():
+        if any(_normalize(dist) in distributions for dist in dists):
+            names.add(module)
+    return names
+
+
+def build_profile():
+    """Derive the minimal dependency set and PyInstaller options for this platform"""
+    sys.path.insert(0, ROOT_DIR)
+    from operation_object.registry import discover
+
+    system = platform.system()
+    modules = imported_modules()
+    selected, missing = required_distributions(modules)
+
+    # Platform-specific packages (e.g. pyobjc) only ship on their own platform
+    if system != 'Darwin':
+        selected = {
+            name: line for name, line in selected.items()
+            if not any(name.startswith(_normalize(prefix)) for prefix in MACOS_SPECIFIC)
+        }
+
+    bundled = top_level_modules(selected) | modules
+    return {
+        "platform": PLATFORM_NAMES.get(system, system.lower()),
+        "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "packages": sorted(selected.values(), key=str.lower),
+        "dropped_essential": sorted(
+            name for name in ESSENTIAL_PACKAGES if _normalize(name) not in selected),
+        "missing": sorted(set(missing)),
+        # The registry imports procedures by name, which static analysis cannot see
+        "hiddenimports": sorted({procedure.module or "operation_object.workflow_procedure" for procedure in discover()}),
+        "excludes": sorted(CANDIDATE_EXCLUDES - bundled),
+    }
+
+
+def write_profile(profile):
+    """Write build_profile.json for main.spec and the slim requirements file"""
+    with open(PROFILE_FILE, 'w') as f:
+        json.dump(profile, f, indent=2)
+    print(f"Successfully updated {PROFILE_FILE}")
+
+    if profile["missing"]:
+        print(f"Warning: not installed, left out of the profile: {', '.join(profile['missing'])}")
+
+    requirements_file = os.path.join(
+        ROOT_DIR, "requirements", f"requirements_{profile['platform']}_slim.txt")
+    return write_requirements(requirements_file, profile["packages"], f"{profile['platform']} (slim build)")
+
+
+if __name__ == "__main__":
+    write_profile(build_profile())
@@ -7,6 +7,7 @@ from datetime import datetime
 ESSENTIAL_PACKAGES = {
     'keyboard',
     'MouseInfo',
+    'numpy',
     'pendulum',
     'pillow',
     'PyAutoGUI',